@@ -0,0 +1,266 @@
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode
+from werkzeug.exceptions import HTTPException
+from config import Config
+from services.cache_service import make_cache_key
+from services.data_service import REPORT_SECTIONS
+from services.dune_service import QueryPending, deferred_queries
+from services.job_service import FINISHED_STATES
+from services.metrics import HTTP_REQUEST_SECONDS, TIMED_BY_SERVER
+
+STREAM_ENDPOINT = "api.stream_rows"
+JOB_ENDPOINT = "api.get_job"
+
+
+class AsyncAdapter:
+    """Serve the Flask app over ASGI without parking threads on Dune.
+
+    Each request runs through the regular WSGI app on a small thread pool
+    with Dune cache misses deferred (see ``deferred_queries``). The misses
+    are then awaited on the event loop with ``execute_query_async`` and the
+    request is run again, now answered from the cache, or from the results
+    awaited for this request when they were errors and so never cached.
+    Threads only ever do cached or CPU-bound work, so one process can hold
+    thousands of requests waiting on Dune. Row streams are served from async
+    result pages, with headers from the app's request hooks, and job
+    long-polls wait on the event loop before the request runs.
+    """
+
+    def __init__(self, app, get_data_service, job_service=None, threads=None, max_passes=None):
+        self.app = app
+        # Called per request, so the DataService is still built lazily
+        self.get_data_service = get_data_service
+        self.job_service = job_service
+        self.max_passes = max_passes if max_passes is not None else Config.ASGI_MAX_PASSES
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads or Config.ASGI_THREADS,
+            thread_name_prefix="asgi",
+        )
+        # The response of a pass that deferred queries is thrown away
+        app.register_error_handler(QueryPending, lambda e: ("", 202))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        started = time.perf_counter()
+        body = await self._read_body(receive)
+        rule, view_args = self._match(scope)
+        endpoint = rule.endpoint if rule is not None else None
+        if endpoint == STREAM_ENDPOINT and view_args["section"] in REPORT_SECTIONS:
+            await self._stream_rows(scope, view_args["section"], send)
+            return
+        if endpoint == JOB_ENDPOINT and self.job_service is not None:
+            scope = await self._wait_for_job(scope, view_args["job_id"])
+        await self._dispatch(scope, body, send, started, rule.rule if rule is not None else "unmatched")
+
+    async def _wait_for_job(self, scope, job_id):
+        """
+        Hold a ``?wait=`` long-poll on the event loop instead of a pool thread
+
+        Returns:
+            dict: The scope without ``wait``, so the app answers at once
+        """
+        args = parse_qs(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        try:
+            wait = min(max(float(args.pop("wait", ["0"])[0]), 0), Config.JOB_MAX_WAIT)
+        except ValueError:
+            wait = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            job = await loop.run_in_executor(self._executor, self.job_service.store.get, job_id)
+            remaining = deadline - loop.time()
+            if job is None or job["state"] in FINISHED_STATES or remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 0.5))
+        return {**scope, "query_string": urlencode(args, doseq=True).encode("latin-1")}
+
+    async def _dispatch(self, scope, body, send, started, route):
+        loop = asyncio.get_running_loop()
+        dune_service = self.get_data_service().dune_service
+        # Every result awaited for this request, so later passes never run a query twice
+        awaited = {}
+        waited = 0.0
+        for attempt in range(self.max_passes + 1):
+            # The last pass executes any remaining misses in its thread, so every request finishes
+            defer = attempt < self.max_passes
+            status, headers, chunks, pending = await loop.run_in_executor(
+                self._executor, self._run_pass, scope, body, attempt, defer, awaited)
+            if not pending:
+                break
+            wait_started = time.perf_counter()
+            queries = {make_cache_key(query_id, params): (query_id, params) for query_id, params in pending}
+            results = await asyncio.gather(
+                *(dune_service.execute_query_async(query_id, params) for query_id, params in queries.values()),
+                return_exceptions=True,
+            )
+            for key, result in zip(queries, results):
+                awaited[key] = {"error": f"Query failed: {result!r}"} if isinstance(result, Exception) else result
+            waited += time.perf_counter() - wait_started
+
+        # The app times only the final pass, so the whole request is timed here
+        elapsed = time.perf_counter() - started
+        HTTP_REQUEST_SECONDS.observe(elapsed, route=route, method=scope["method"], status=status)
+        if Config.SERVER_TIMING_ENABLED:
+            if waited:
+                headers = _add_server_timing(headers, f"dune-wait;dur={waited * 1000:.1f}")
+            headers = _add_server_timing(headers, f"total;dur={elapsed * 1000:.1f}")
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    def _run_pass(self, scope, body, attempt, defer, awaited):
+        """Run the request through the WSGI app once, in a worker thread"""
+        response = {}
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+            return chunks.append
+
+        def run():
+            environ = self._environ(scope, body, attempt)
+            environ[TIMED_BY_SERVER] = True
+            result = self.app(environ, start_response)
+            try:
+                chunks.extend(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        with deferred_queries(awaited, defer) as pending:
+            run()
+        return response["status"], response["headers"], chunks, pending
+
+    async def _stream_rows(self, scope, section, send):
+        args = parse_qs(scope["query_string"].decode("latin-1"))
+
+        def arg(name, type=str):
+            try:
+                return type(args[name][0]) if name in args else None
+            except ValueError:
+                return None
+
+        as_array = arg("format") == "json"
+        status, headers, early_body = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._stream_headers, scope,
+            "application/json" if as_array else "application/x-ndjson")
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if early_body is not None:
+            await send({"type": "http.response.body", "body": early_body})
+            return
+
+        query_id, params = self.get_data_service().section_query(
+            section, arg("token_address"), arg("days", int), arg("launchpad"))
+        first = True
+        if as_array:
+            await send({"type": "http.response.body", "body": b"[", "more_body": True})
+        pages = self.get_data_service().dune_service.stream_query_async(query_id, params, arg("page_size", int))
+        async for rows in pages:
+            if not rows:
+                continue
+            encoded = [json.dumps(row, separators=(",", ":")) for row in rows]
+            if as_array:
+                chunk = ("" if first else ",") + ",".join(encoded)
+            else:
+                chunk = "\n".join(encoded) + "\n"
+            first = False
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"]" if as_array else b""})
+
+    def _stream_headers(self, scope, mimetype):
+        """
+        Run the app's before- and after-request hooks for a row stream
+        
+        Streams skip the Flask view, so this is where they get the same CORS
+        headers, request metrics and Server-Timing as any other response.
+        Like a streamed WSGI response, they are timed up to the headers.
+        
+        Returns:
+            tuple: ``(status, headers, body)``, where body is None unless a
+            before-request hook answered the request itself
+        """
+        with self.app.request_context(self._environ(scope, b"")):
+            early = self.app.preprocess_request()
+            response = self.app.make_response(early) if early is not None else self.app.response_class(mimetype=mimetype)
+            response = self.app.process_response(response)
+            headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()
+                       if early is not None or k.lower() != "content-length"]
+            return response.status_code, headers, response.get_data() if early is not None else None
+
+    def _match(self, scope):
+        adapter = self.app.url_map.bind("localhost", script_name=scope.get("root_path") or None)
+        try:
+            return adapter.match(scope["path"], method=scope["method"], return_rule=True)
+        except HTTPException:
+            return None, {}
+
+    def _environ(self, scope, body, attempt=0):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            # WSGI carries the raw path bytes as latin-1 text
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            key = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if key == "CONTENT_TYPE":
+                environ[key] = value
+            elif key == "CONTENT_LENGTH" or (key == "X_REQUEST_START" and attempt):
+                # Queue time belongs to the first pass only
+                continue
+            else:
+                key = f"HTTP_{key}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def _read_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _add_server_timing(headers, entry):
+    for i, (name, value) in enumerate(headers):
+        if name == b"server-timing":
+            headers[i] = (name, value + b", " + entry.encode())
+            return headers
+    return headers + [(b"server-timing", entry.encode())]
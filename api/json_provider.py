@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider, _default
+from config import Config
+from services.metrics import HTTP_SERIALIZE_SECONDS, timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def route_label():
+    """Return the matched URL rule for metric labels, keeping label cardinality bounded"""
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return "unmatched"
+
+
+class EncodedBody:
+    """A response payload encoded once, with its ETag and a lazily built gzip variant"""
+
+    def __init__(self, payload, body):
+        self.payload = payload
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=Config.RESPONSE_GZIP_LEVEL)
+        return self._gzipped
+
+
+class EncodedBodyCache:
+    """Encoded response bodies keyed by the identity of the payload object.
+
+    Cache hits in DuneService hand back the very object stored in the
+    result cache, so an identity match means the bytes are still current.
+    Entries keep a reference to their payload, which stops its ``id`` from
+    being reused while the entry lives. A payload is only stored the second
+    time it is seen, so per-request objects never take up slots.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, payload):
+        with self._lock:
+            entry = self._entries.get(id(payload))
+            if entry is None or entry.payload is not payload:
+                return None
+            self._entries.move_to_end(id(payload))
+            return entry
+
+    def admit(self, payload, body):
+        """Build the encoded entry for ``payload``, storing it if seen before"""
+        entry = EncodedBody(payload, body)
+        if self.max_entries <= 0:
+            return entry
+        key = id(payload)
+        with self._lock:
+            if self._seen.pop(key, None) is None:
+                self._seen[key] = True
+                while len(self._seen) > self.max_entries * 4:
+                    self._seen.popitem(last=False)
+                return entry
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records how long each response takes to encode
+
+    Encodes with orjson when it is installed and ``JSON_PROVIDER`` is
+    ``orjson``, otherwise with the standard library. Responses carry an
+    ETag, answer ``If-None-Match`` with 304, and are gzipped for clients that
+    accept it. Bodies of payloads served repeatedly from the result cache
+    are encoded and compressed only once.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and Config.JSON_PROVIDER == "orjson"
+        self.bodies = EncodedBodyCache(Config.RESPONSE_CACHE_ENTRIES)
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self._encode(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with timed(HTTP_SERIALIZE_SECONDS, timing_name="serialize", route=route_label()):
+            obj = self._prepare_response_obj(args, kwargs)
+            entry = self.bodies.get(obj)
+            if entry is None:
+                entry = self.bodies.admit(obj, self._encode(obj) + b"\n")
+            return self._make_response(entry)
+
+    def _encode(self, obj):
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        if self.use_orjson:
+            # Dates go through Flask's default so they render as HTTP dates, like the stdlib path
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=_default, option=option)
+            except TypeError:
+                # orjson rejects integers beyond 64 bits, which the standard library encodes fine
+                pass
+        if indent:
+            return super().dumps(obj, indent=2).encode()
+        return super().dumps(obj, separators=(",", ":")).encode()
+
+    def _make_response(self, entry):
+        response = self._app.response_class(entry.body, mimetype=self.mimetype)
+        if not has_request_context():
+            return response
+        response.vary.add("Accept-Encoding")
+        compress = len(entry.body) >= Config.RESPONSE_GZIP_MIN_BYTES and "gzip" in request.accept_encodings
+        # Each encoding is a different representation, so it gets its own ETag
+        etag = f"{entry.etag}-gzip" if compress else entry.etag
+        response.set_etag(etag)
+        if compress:
+            response.set_data(entry.gzipped())
+            response.headers["Content-Encoding"] = "gzip"
+        # Only the representation being sent may be answered with 304
+        if request.if_none_match.contains(etag):
+            return response.make_conditional(request)
+        return response
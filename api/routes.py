@@ -1,61 +1,293 @@
-from flask import Blueprint, jsonify, request
-from services.data_service import DataService
+import inspect
+import threading
+from flask import Blueprint, Response, jsonify, request, url_for
+from config import Config
+from services.data_service import (
+    BATCH_SECTIONS, DataService, POSITIVE_PARAMS, REPORT_SECTIONS, SECTION_METHODS, SECTION_PARAM_TYPES,
+)
+from services.job_service import FINISHED_STATES, JobService, to_payload
+from utils.helpers import stream_json_array, stream_ndjson
 
 api_bp = Blueprint('api', __name__)
-data_service = DataService()
+
+# Built by the first request that needs it, so a cold worker starts serving sooner
+_data_service = None
+_data_service_lock = threading.Lock()
+
+def get_data_service(create=True):
+    """Return the shared DataService, building it on first use unless ``create`` is False"""
+    global _data_service
+    if _data_service is None and create:
+        with _data_service_lock:
+            if _data_service is None:
+                service = DataService()
+                if Config.REFRESH_SCHEDULER_ENABLED:
+                    service.dune_service.refresh_scheduler.start()
+                _data_service = service
+    return _data_service
+
+def _non_positive(**args):
+    """Return the name of the first argument that is set but below 1, if any"""
+    return next((name for name, value in args.items() if value is not None and value < 1), None)
+
+def _coerce_params(params):
+    """
+    Check job params against SECTION_PARAM_TYPES, converting numbers given as
+    strings to the types the routes parse query-string args to
+    
+    Raises:
+        ValueError: If a param has the wrong type
+    """
+    coerced = dict(params)
+    for name, kind in SECTION_PARAM_TYPES.items():
+        value = params.get(name)
+        if value is None:
+            continue
+        if kind is str:
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+            continue
+        if kind is list:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{name} must be a list of strings")
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{name} must be a number")
+        if kind is int and isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"{name} must be an integer")
+        try:
+            coerced[name] = kind(value)
+        except ValueError:
+            raise ValueError(f"{name} must be {'an integer' if kind is int else 'a number'}") from None
+    return coerced
+
+def _checked_params(params):
+    """
+    Coerce section params and check those in POSITIVE_PARAMS are at least 1
+    
+    Raises:
+        ValueError: If a param has the wrong type or is not positive where it must be
+    """
+    params = _coerce_params(params)
+    invalid = _non_positive(**{name: params.get(name) for name in POSITIVE_PARAMS})
+    if invalid:
+        raise ValueError(f"{invalid} must be a positive integer")
+    return params
+
+def _run_section(section, params=None):
+    return get_data_service().run_section(section, params)
+
+job_service = JobService(_run_section)
 
 @api_bp.route('/transaction-flow', methods=['GET'])
 def transaction_flow():
     token_address = request.args.get('token_address')
-    data = data_service.get_transaction_flow_data(token_address)
+    cluster = request.args.get('cluster')
+    if cluster is not None:
+        # Only the local graph engine needs numpy; plain requests don't import it
+        from services.graph_engine import CLUSTER_METHODS
+        if cluster not in CLUSTER_METHODS:
+            return jsonify({"error": f"Unknown clustering method: {cluster}"}), 400
+    top_k = request.args.get('top_k', type=int)
+    max_links = request.args.get('max_links', type=int)
+    invalid = _non_positive(top_k=top_k, max_links=max_links)
+    if invalid:
+        return jsonify({"error": f"{invalid} must be a positive integer"}), 400
+    data = get_data_service().get_transaction_flow_data(
+        token_address,
+        top_k=top_k,
+        min_weight=request.args.get('min_weight', type=float),
+        max_links=max_links,
+        cluster=cluster,
+    )
     return jsonify(data)
 
 @api_bp.route('/anomaly-detection', methods=['GET'])
 def anomaly_detection():
     token_address = request.args.get('token_address')
     days = request.args.get('days', default=14, type=int)
-    data = data_service.get_anomaly_data(token_address, days)
+    detector = request.args.get('detector')
+    window = request.args.get('window', default=7, type=int)
+    threshold = request.args.get('threshold', default=3.0, type=float)
+    if detector is not None:
+        from services.anomaly_engine import DETECTORS
+        if detector not in DETECTORS:
+            return jsonify({"error": f"Unknown detector: {detector}"}), 400
+    invalid = _non_positive(days=days, window=window)
+    if invalid:
+        return jsonify({"error": f"{invalid} must be a positive integer"}), 400
+    data = get_data_service().get_anomaly_data(token_address, days, detector, window, threshold)
+    return jsonify(data)
+
+@api_bp.route('/anomaly-scan', methods=['GET'])
+def anomaly_scan():
+    from services.anomaly_engine import DETECTORS
+    launchpad = request.args.get('launchpad')
+    days = request.args.get('days', default=30, type=int)
+    detector = request.args.get('detector', default='zscore')
+    window = request.args.get('window', default=7, type=int)
+    threshold = request.args.get('threshold', default=3.0, type=float)
+    limit = request.args.get('limit', default=50, type=int)
+    if detector not in DETECTORS:
+        return jsonify({"error": f"Unknown detector: {detector}"}), 400
+    invalid = _non_positive(window=window, limit=limit)
+    if invalid:
+        return jsonify({"error": f"{invalid} must be a positive integer"}), 400
+    data = get_data_service().scan_launchpad_anomalies(launchpad, days, detector, window, threshold, limit)
     return jsonify(data)
 
 @api_bp.route('/ownership-concentration', methods=['GET'])
 def ownership_concentration():
     token_address = request.args.get('token_address')
-    data = data_service.get_ownership_data(token_address)
+    top_n = request.args.get('top_n', default=10, type=int)
+    data = get_data_service().get_ownership_data(token_address, top_n)
+    return jsonify(data)
+
+@api_bp.route('/holder-stats', methods=['GET'])
+def holder_stats():
+    token_address = request.args.get('token_address')
+    top_n = request.args.get('top_n', default=10, type=int)
+    data = get_data_service().get_holder_stats(token_address, top_n)
     return jsonify(data)
 
 @api_bp.route('/sell-off-patterns', methods=['GET'])
 def sell_off_patterns():
     token_address = request.args.get('token_address')
     days = request.args.get('days', default=7, type=int)
-    data = data_service.get_sell_off_data(token_address, days)
+    if days < 1:
+        return jsonify({"error": "days must be a positive integer"}), 400
+    data = get_data_service().get_sell_off_data(token_address, days)
     return jsonify(data)
 
 @api_bp.route('/volume-brackets', methods=['GET'])
 def volume_brackets():
     launchpad = request.args.get('launchpad')
     days = request.args.get('days', default=30, type=int)
-    data = data_service.get_volume_bracket_data(launchpad, days)
+    data = get_data_service().get_volume_bracket_data(launchpad, days)
     return jsonify(data)
 
 @api_bp.route('/bot-volume', methods=['GET'])
 def bot_volume():
     token_address = request.args.get('token_address')
-    data = data_service.get_bot_volume_data(token_address)
+    data = get_data_service().get_bot_volume_data(token_address)
     return jsonify(data)
 
 @api_bp.route('/post-rug-indicators', methods=['GET'])
 def post_rug_indicators():
     token_address = request.args.get('token_address')
-    data = data_service.get_post_rug_data(token_address)
+    days = request.args.get('days', default=7, type=int)
+    if days < 1:
+        return jsonify({"error": "days must be a positive integer"}), 400
+    data = get_data_service().get_post_rug_data(token_address, days)
     return jsonify(data)
 
 @api_bp.route('/wallet-clustering', methods=['GET'])
 def wallet_clustering():
     token_address = request.args.get('token_address')
-    data = data_service.get_wallet_clustering_data(token_address)
+    method = request.args.get('method')
+    if method is not None:
+        from services.graph_engine import CLUSTER_METHODS
+        if method not in CLUSTER_METHODS:
+            return jsonify({"error": f"Unknown clustering method: {method}"}), 400
+    top_k = request.args.get('top_k', type=int)
+    max_links = request.args.get('max_links', type=int)
+    invalid = _non_positive(top_k=top_k, max_links=max_links)
+    if invalid:
+        return jsonify({"error": f"{invalid} must be a positive integer"}), 400
+    data = get_data_service().get_wallet_clustering_data(
+        token_address,
+        method=method,
+        top_k=top_k,
+        min_weight=request.args.get('min_weight', type=float),
+        max_links=max_links,
+    )
     return jsonify(data)
 
 @api_bp.route('/dashboard-summary', methods=['GET'])
 def dashboard_summary():
-    data = data_service.get_dashboard_summary()
-    return jsonify(data)
\ No newline at end of file
+    data = get_data_service().get_dashboard_summary()
+    return jsonify(data)
+
+@api_bp.route('/token-report', methods=['GET'])
+def token_report():
+    token_address = request.args.get('token_address')
+    launchpad = request.args.get('launchpad')
+    sections = [s for s in request.args.get('sections', '').split(',') if s] or None
+    unknown = sorted(set(sections or ()) - set(REPORT_SECTIONS))
+    if unknown:
+        return jsonify({"error": f"Unknown sections: {', '.join(unknown)}"}), 400
+    data = get_data_service().get_token_report(token_address, sections, launchpad)
+    return jsonify(data)
+
+@api_bp.route('/batch/<section>', methods=['POST'])
+def batch(section):
+    if section not in BATCH_SECTIONS:
+        return jsonify({"error": f"Unknown batch section: {section}"}), 404
+    body = request.get_json(silent=True) or {}
+    token_addresses = body.get('token_addresses')
+    if (not isinstance(token_addresses, list) or not token_addresses
+            or not all(isinstance(token, str) and token for token in token_addresses)):
+        return jsonify({"error": "token_addresses must be a non-empty list of strings"}), 400
+    if len(token_addresses) > Config.BATCH_MAX_TOKENS:
+        return jsonify({"error": f"At most {Config.BATCH_MAX_TOKENS} token addresses per batch"}), 400
+    params = {k: v for k, v in body.items() if k != 'token_addresses'}
+    method = get_data_service().batch_method(section)
+    try:
+        inspect.signature(method).bind(token_addresses, **params)
+    except TypeError as e:
+        return jsonify({"error": f"Invalid params: {e}"}), 400
+    try:
+        params = _checked_params(params)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid params: {e}"}), 400
+    
+    results = method(token_addresses, **params)
+    return jsonify({"section": section, "results": results})
+
+@api_bp.route('/stream/<section>', methods=['GET'])
+def stream_rows(section):
+    if section not in REPORT_SECTIONS:
+        return jsonify({"error": f"Unknown section: {section}"}), 404
+    rows = get_data_service().stream_section_rows(
+        section,
+        token_address=request.args.get('token_address'),
+        days=request.args.get('days', type=int),
+        launchpad=request.args.get('launchpad'),
+        page_size=request.args.get('page_size', type=int),
+    )
+    if request.args.get('format', 'ndjson') == 'json':
+        return Response(stream_json_array(rows), mimetype='application/json')
+    return Response(stream_ndjson(rows), mimetype='application/x-ndjson')
+
+@api_bp.route('/jobs', methods=['POST'])
+def create_job():
+    body = request.get_json(silent=True) or {}
+    section = body.get('section')
+    params = body.get('params') or {}
+    if section not in SECTION_METHODS:
+        return jsonify({"error": f"Unknown section: {section}"}), 400
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+    try:
+        inspect.signature(get_data_service().section_method(section)).bind(**params)
+    except TypeError as e:
+        return jsonify({"error": f"Invalid params: {e}"}), 400
+    try:
+        params = _checked_params(params)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid params: {e}"}), 400
+    
+    job = job_service.submit(section, params)
+    if job is None:
+        return jsonify({"error": "Job queue is full"}), 503, {"Retry-After": "30"}
+    return jsonify(to_payload(job)), 202, {"Location": url_for('api.get_job', job_id=job["id"])}
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    wait = min(max(request.args.get('wait', default=0, type=float), 0), Config.JOB_MAX_WAIT)
+    job = job_service.get(job_id, wait)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job["state"] in FINISHED_STATES:
+        return jsonify(to_payload(job))
+    return jsonify(to_payload(job)), 200, {"Retry-After": "1"}
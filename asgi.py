@@ -0,0 +1,9 @@
+"""ASGI entry point, where requests await Dune instead of holding a worker thread.
+
+    uvicorn asgi:app --workers 2
+"""
+from api.async_adapter import AsyncAdapter
+from api.routes import get_data_service, job_service
+from main import create_app
+
+app = AsyncAdapter(create_app(), get_data_service, job_service)
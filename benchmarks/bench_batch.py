@@ -0,0 +1,113 @@
+"""Compare Dune execution counts for per-token queries with and without batching.
+
+Usage:
+    python -m benchmarks.bench_batch [--tokens 200] [--concurrency 50] [--window 0.05]
+        [--output results.json] [--baseline previous.json]
+
+Runs DuneService in API mode against benchmarks.fake_dune. ``per-token``
+issues one bot_volume query per token from ``--concurrency`` threads, the way
+launchpad scanners call /api/bot-volume. ``batch-call`` passes every token
+to ``execute_batch`` at once, as POST /api/batch/bot-volume does. Each mode
+runs with batching off (window 0) and with ``--window``, and reports how many
+executions reached the fake along with per-token latency.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DUNE_USE_API", "1")
+os.environ.setdefault("DUNE_RATE_LIMIT_PER_MINUTE", "0")
+os.environ.setdefault("CACHE_SHARED_PATH", "")
+os.environ.setdefault("REFRESH_BUDGET_PATH", "")
+os.environ.setdefault("REFRESH_SCHEDULER_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# The fake answers any query ID; batching only runs once the batch variant has one
+os.environ.setdefault("DUNE_QUERY_BOT_VOLUME_BATCH", "bot_volume_batch")
+
+from benchmarks import fake_dune
+from benchmarks.results import compare, percentile, save
+from services.async_dune_client import AsyncDuneClient
+from services.cache_service import ResultCache
+from services.dune_service import DuneService
+from services.query_batcher import QueryBatcher
+
+
+def make_service(base_url, window, max_size):
+    service = DuneService(cache=ResultCache(timeouts={}, shared_path=""))
+    service.async_client = AsyncDuneClient(base_url=base_url, poll_interval=0.05, poll_max_interval=0.2)
+    service.batcher = QueryBatcher(service._execute_batch, window, max_size)
+    return service
+
+
+def run_per_token(service, tokens, concurrency):
+    def one(token):
+        started = time.perf_counter()
+        result = service.execute_query("bot_volume", {"token_address": token})
+        return time.perf_counter() - started, "error" not in result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, tokens))
+
+
+def run_batch_call(service, tokens, concurrency):
+    started = time.perf_counter()
+    results = service.execute_batch("bot_volume", tokens)
+    elapsed = time.perf_counter() - started
+    return [(elapsed, "error" not in results[token]) for token in tokens]
+
+
+MODES = {"per-token": run_per_token, "batch-call": run_batch_call}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--window", type=float, default=0.05, help="Batching window in seconds")
+    parser.add_argument("--max-size", type=int, default=100, help="Most tokens per batch")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    fake_dune.add_arguments(parser)
+    parser.set_defaults(rows=20)
+    args = parser.parse_args()
+
+    dune = fake_dune.from_arguments(args)
+    server, base_url = fake_dune.start_server(dune)
+    results = []
+    try:
+        for mode, run in MODES.items():
+            for window in (0, args.window):
+                service = make_service(base_url, window, args.max_size)
+                tokens = [f"{mode}-w{window}-{i}" for i in range(args.tokens)]
+                executions = dune.counts["execute"]
+                started = time.perf_counter()
+                samples = run(service, tokens, args.concurrency)
+                elapsed = time.perf_counter() - started
+                service._loop.run(service.async_client.close())
+
+                latencies = sorted(seconds for seconds, _ in samples)
+                result = {
+                    "mode": mode,
+                    "window_ms": round(window * 1000),
+                    "tokens": args.tokens,
+                    "executions": dune.counts["execute"] - executions,
+                    "errors": sum(1 for _, ok in samples if not ok),
+                    "elapsed_s": round(elapsed, 2),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                }
+                results.append(result)
+                print(json.dumps(result))
+    finally:
+        server.shutdown()
+
+    if args.output:
+        save(args.output, {"results": results})
+    if args.baseline:
+        compare(args.baseline, results, ("mode", "window_ms"), ("executions", "elapsed_s", "p95_ms"))
+
+
+if __name__ == "__main__":
+    main()
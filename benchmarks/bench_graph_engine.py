@@ -0,0 +1,67 @@
+"""Time the graph engine on synthetic transfer graphs.
+
+Usage:
+    python -m benchmarks.bench_graph_engine [--edges 100000 1000000 10000000] [--output results.json]
+
+Graphs have one node per ten edges and mostly local transfers, so they
+contain both many small clusters and a few large components.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.graph_engine import TransferGraph
+
+
+def make_graph(edges, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = max(edges // 10, 2)
+    src = rng.integers(0, nodes, edges)
+    # Mostly short hops, with occasional long-range transfers joining clusters
+    hop = np.where(rng.random(edges) < 0.99, rng.integers(1, 20, edges), rng.integers(1, nodes, edges))
+    dst = (src + hop) % nodes
+    weight = rng.lognormal(mean=3, sigma=1.5, size=edges)
+    return TransferGraph(range(nodes), src, dst, weight)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edges", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    for edges in args.edges:
+        graph = make_graph(edges)
+        _, csr_s = timed(graph.csr)
+        components, components_s = timed(graph.connected_components)
+        labels, lpa_s = timed(graph.label_propagation)
+        _, prune_s = timed(lambda: graph.prune(top_k=500, max_links=2000))
+        result = {
+            "edges": edges,
+            "nodes": graph.node_count,
+            "csr_s": csr_s,
+            "components_s": components_s,
+            "components": int(len(np.unique(components))),
+            "label_propagation_s": lpa_s,
+            "clusters": int(len(np.unique(labels))),
+            "prune_s": prune_s,
+        }
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmarks for response formatting, JSON encoding and cache hit paths.
+
+Usage:
+    python -m benchmarks.bench_micro [--rows 1000 10000 100000] [--output results.json]
+        [--baseline previous.json]
+
+Each case reports the median time per call over several repeats. Payloads
+use the fake Dune row shape from benchmarks.fake_dune. ``json_dumps``
+encodes the payload every call; ``jsonify`` serves the same payload object
+repeatedly, as cache hits do, so it includes any reuse of encoded bodies.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("CACHE_SHARED_PATH", "")
+os.environ.setdefault("REFRESH_SCHEDULER_ENABLED", "0")
+
+from flask import jsonify
+
+from benchmarks.fake_dune import make_row
+from benchmarks.results import compare, save
+from main import create_app
+from services.cache_service import ResultCache
+from services.dune_service import DuneService
+from utils.helpers import format_dune_response
+
+
+def measure(fn, min_time=0.2, repeats=5):
+    """Median seconds per call of ``fn``, calibrated to run ``min_time`` per repeat"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+    return statistics.median(timings)
+
+
+def bench_cases(rows, workdir):
+    response = {"execution_id": "bench", "result": {"rows": [make_row(i) for i in range(rows)]}}
+
+    app = create_app()
+
+    def jsonify_payload():
+        with app.test_request_context("/api/bench"):
+            jsonify(response).get_data()
+
+    local = ResultCache(shared_path="")
+    local.set("bench", {"rows": rows}, response)
+
+    shared_path = os.path.join(workdir, f"shared-{rows}.sqlite3")
+    ResultCache(shared_path=shared_path).set("bench", {"rows": rows}, response)
+
+    def shared_hit():
+        # A fresh local tier each call, so every lookup falls through to SQLite
+        ResultCache(shared_path=shared_path).get("bench", {"rows": rows})
+
+    dune_service = DuneService(cache=local)
+
+    return {
+        "format_dune_response": lambda: format_dune_response(response),
+        "json_dumps": lambda: app.json.dumps(response),
+        "jsonify": jsonify_payload,
+        "cache_local_hit": lambda: local.get("bench", {"rows": rows}),
+        "cache_shared_hit": shared_hit,
+        "execute_query_hit": lambda: dune_service.execute_query("bench", {"rows": rows}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="verdexa-micro-") as workdir:
+        for rows in args.rows:
+            for case, fn in bench_cases(rows, workdir).items():
+                result = {"case": case, "rows": rows, "us_per_call": round(measure(fn) * 1e6, 2)}
+                results.append(result)
+                print(json.dumps(result))
+
+    if args.output:
+        save(args.output, {"results": results})
+    if args.baseline:
+        compare(args.baseline, results, ("case", "rows"), ("us_per_call",))
+
+
+if __name__ == "__main__":
+    main()
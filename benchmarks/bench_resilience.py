@@ -0,0 +1,199 @@
+"""Exercise Dune rate limiting, retries and the circuit breaker against a faulty fake Dune API.
+
+Usage:
+    python -m benchmarks.bench_resilience [--scenarios flaky priority outage]
+        [--queries 40] [--concurrency 8] [--output results.json] [--baseline previous.json]
+
+Runs DuneService in API mode against benchmarks.fake_dune, one scenario at a
+time:
+
+``flaky``
+    ``--queries`` cold queries while the fake answers ``--error-rate`` of
+    requests with 500 and ``--throttle-rate`` with 429, once with retries
+    disabled and once with ``--retries``. Reports the share of queries that
+    succeeded and their latency.
+``priority``
+    The fake enforces ``--rate-limit`` requests per minute and the client
+    limiter is sized to match. ``--queries`` background refreshes are
+    started, then the same number of interactive queries. Reports the
+    median completion time of each class; interactive queries should
+    finish first although they were started last.
+``outage``
+    Warms ``--queries`` keys, lets them expire, then fails every upstream
+    request. Expired keys must keep being served from the cache, cold keys
+    must fail fast once the breaker opens, and everything must recover after
+    the fake heals and ``--reset-timeout`` passes.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DUNE_USE_API", "1")
+os.environ.setdefault("CACHE_SHARED_PATH", "")
+os.environ.setdefault("REFRESH_BUDGET_PATH", "")
+os.environ.setdefault("REFRESH_SCHEDULER_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks import fake_dune
+from benchmarks.results import compare, percentile, save
+from services.async_dune_client import AsyncDuneClient
+from services.cache_service import ResultCache
+from services.circuit_breaker import CircuitBreaker
+from services.dune_service import DuneService
+from services.rate_limit import PriorityRateLimiter, TokenBucket
+
+
+def make_service(base_url, retries, rate_limit=0, failures=5, reset_timeout=30, ttl=3600):
+    """DuneService with its own client, limiter, breaker and in-process cache"""
+    service = DuneService(cache=ResultCache(default_timeout=ttl, timeouts={}, shared_path=""))
+    limiter = PriorityRateLimiter()
+    if rate_limit:
+        rate = rate_limit / 60
+        limiter = PriorityRateLimiter(TokenBucket(rate, max(1, rate_limit // 6)), rate)
+    service.async_client = AsyncDuneClient(
+        base_url=base_url, poll_interval=0.05, poll_max_interval=0.2,
+        limiter=limiter, breaker=CircuitBreaker(failures, reset_timeout), retry_attempts=retries,
+    )
+    # Keep the backoff short so scenarios finish quickly; the shape is what matters
+    service.async_client.retry_base_delay = 0.05
+    service.async_client.retry_max_delay = 0.5
+    return service
+
+
+def close(service):
+    service._loop.run(service.async_client.close())
+
+
+def run_all(fn, items, concurrency):
+    """Run ``fn`` over ``items`` on a thread pool; returns ``(seconds, ok)`` per item"""
+    def one(item):
+        started = time.perf_counter()
+        result = fn(item)
+        return time.perf_counter() - started, not (isinstance(result, dict) and "error" in result)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, items))
+
+
+def summarize(samples):
+    latencies = sorted(seconds for seconds, _ in samples)
+    return {
+        "queries": len(samples),
+        "success_rate": round(sum(ok for _, ok in samples) / len(samples), 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def scenario_flaky(args, dune, base_url):
+    results = []
+    for retries in (0, args.retries):
+        dune.error_rate, dune.throttle_rate, dune.retry_after = args.error_rate, args.throttle_rate, None
+        # A breaker that never opens, so every query reaches the fake
+        service = make_service(base_url, retries, failures=10 ** 9)
+        samples = run_all(
+            lambda i: service.execute_query("flaky", {"run": retries, "i": i}), range(args.queries), args.concurrency)
+        results.append({"scenario": "flaky", "variant": f"retries={retries}", **summarize(samples),
+                        **service.async_client.stats()})
+        close(service)
+    return results
+
+
+def scenario_priority(args, dune, base_url):
+    dune.error_rate = dune.throttle_rate = 0.0
+    dune.bucket = TokenBucket(args.rate_limit / 60, max(1, args.rate_limit // 6))
+    service = make_service(base_url, args.retries, rate_limit=args.rate_limit)
+    started = time.perf_counter()
+    finished = {"background": [], "interactive": []}
+
+    def run(kind, i):
+        if kind == "background":
+            service.refresh("priority", {"kind": kind, "i": i})
+        else:
+            service.execute_query("priority", {"kind": kind, "i": i})
+        finished[kind].append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=2 * args.queries) as pool:
+        for kind in ("background", "interactive"):
+            for i in range(args.queries):
+                pool.submit(run, kind, i)
+            time.sleep(0.05)
+    dune.bucket = None
+    close(service)
+    return [{
+        "scenario": "priority",
+        "variant": kind,
+        "queries": len(times),
+        "median_done_s": round(statistics.median(times), 2),
+        "last_done_s": round(max(times), 2),
+        **service.async_client.stats(),
+    } for kind, times in finished.items()]
+
+
+def scenario_outage(args, dune, base_url):
+    dune.error_rate = dune.throttle_rate = 0.0
+    service = make_service(base_url, args.retries, reset_timeout=args.reset_timeout, ttl=1)
+    warm = [{"key": i} for i in range(args.queries)]
+    run_all(lambda params: service.execute_query("outage", params), warm, args.concurrency)
+    time.sleep(1.1)
+
+    dune.error_rate = 1.0
+    stale = run_all(lambda params: service.execute_query("outage", params), warm, args.concurrency)
+    for params in warm:
+        service.refresh("outage", params)
+    cold = run_all(lambda i: service.execute_query("outage", {"cold": i}), range(args.queries), args.concurrency)
+    during = service.async_client.stats()
+
+    dune.error_rate = 0.0
+    time.sleep(args.reset_timeout)
+    recovered = run_all(lambda i: service.execute_query("outage", {"after": i}), range(args.queries),
+                        args.concurrency)
+    close(service)
+    return [
+        {"scenario": "outage", "variant": "expired keys", **summarize(stale)},
+        {"scenario": "outage", "variant": "cold keys", **summarize(cold), **during},
+        {"scenario": "outage", "variant": "recovered", **summarize(recovered), **service.async_client.stats()},
+    ]
+
+
+SCENARIOS = {"flaky": scenario_flaky, "priority": scenario_priority, "outage": scenario_outage}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--queries", type=int, default=40, help="Queries per scenario step")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=4, help="Retry attempts once retries are enabled")
+    parser.add_argument("--reset-timeout", type=float, default=2, help="Circuit breaker reset timeout in seconds")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    fake_dune.add_arguments(parser)
+    parser.set_defaults(latency=0.05, error_rate=0.2, throttle_rate=0.1, rate_limit=600)
+    args = parser.parse_args()
+
+    dune = fake_dune.from_arguments(args)
+    # Fault rates and the server-side rate limit are switched on per scenario
+    dune.error_rate = dune.throttle_rate = 0.0
+    dune.bucket = None
+    server, base_url = fake_dune.start_server(dune)
+    results = []
+    try:
+        for name in args.scenarios:
+            for result in SCENARIOS[name](args, dune, base_url):
+                results.append(result)
+                print(json.dumps(result))
+    finally:
+        server.shutdown()
+
+    if args.output:
+        save(args.output, {"fake_dune": dune.counts, "results": results})
+    if args.baseline:
+        compare(args.baseline, results, ("scenario", "variant"), ("success_rate", "p50_ms", "p95_ms"))
+
+
+if __name__ == "__main__":
+    main()
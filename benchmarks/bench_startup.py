@@ -0,0 +1,182 @@
+"""Measure import time, app creation and first-request latency of a fresh worker.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--route /api/bot-volume?token_address=x]
+        [--imports 10] [--output results.json] [--baseline previous.json]
+
+Every measurement runs in a new interpreter, the way a Render or Vercel cold
+start does: it imports ``main``, calls ``create_app()`` and sends one route
+through the test client twice, in API mode against benchmarks.fake_dune.
+
+``cold`` starts with empty on-disk tiers, so the first request waits on
+Dune. ``persisted`` starts from the shared result cache and dashboard
+snapshot a previous worker left behind. ``warm-up`` does the same with
+WARMUP_ON_START=1, moving the deferred imports and the cache promotion from
+the first request into ``create_app``. ``ready_ms`` is the time from
+spawning the interpreter until the app could take its first request.
+
+``--imports`` also lists the modules ``import main`` spends the most time
+in, from ``python -X importtime``.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import fake_dune
+from benchmarks.results import compare, save
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROUTES = (
+    "/api/bot-volume?token_address=startup",
+    "/api/anomaly-scan?launchpad=startup",
+    "/api/dashboard-summary",
+)
+
+SCENARIOS = ("cold", "persisted", "warm-up")
+
+# Runs in the fresh interpreter; prints one JSON line of timings
+WORKER = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+ready_at = time.time()
+client = app.test_client()
+timings = []
+for _ in range(2):
+    request_started = time.perf_counter()
+    status = client.get(sys.argv[1]).status_code
+    timings.append(time.perf_counter() - request_started)
+print(json.dumps({
+    "ready_at": ready_at,
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": timings[0] * 1000,
+    "second_request_ms": timings[1] * 1000,
+    "status": status,
+}))
+"""
+
+
+def worker_env(dune_url, workdir, warm_up):
+    env = dict(os.environ)
+    env.update({
+        "DUNE_USE_API": "1",
+        "DUNE_API_KEY": "benchmark",
+        "DUNE_API_BASE_URL": dune_url,
+        "DUNE_RATE_LIMIT_PER_MINUTE": "0",
+        "REFRESH_SCHEDULER_ENABLED": "0",
+        "SERIES_STORE_ENABLED": "0",
+        "WARMUP_ON_START": "1" if warm_up else "0",
+        "LOG_LEVEL": "WARNING",
+    })
+    # Keep every on-disk tier inside this scenario's scratch directory
+    for name, path in (
+        ("CACHE_SHARED_PATH", "results.sqlite3"),
+        ("REFRESH_BUDGET_PATH", "budget.sqlite3"),
+        ("DUNE_RATE_LIMIT_PATH", "budget.sqlite3"),
+        ("HOLDER_INDEX_PATH", "holders"),
+        ("DASHBOARD_AGGREGATES_PATH", "dashboard.json"),
+        ("JOB_STORE_PATH", "jobs.sqlite3"),
+    ):
+        env[name] = os.path.join(workdir, path)
+    return env
+
+
+def run_worker(route, env):
+    spawned = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-c", WORKER, route], env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample["ready_ms"] = (sample.pop("ready_at") - spawned) * 1000
+    return sample
+
+
+def run_scenario(scenario, route, dune_url, repeat):
+    samples = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix="verdexa-startup-")
+        try:
+            if scenario != "cold":
+                # A previous worker served the route and left its results on disk
+                run_worker(route, worker_env(dune_url, workdir, False))
+            samples.append(run_worker(route, worker_env(dune_url, workdir, scenario == "warm-up")))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {"scenario": scenario, "route": route, "status": samples[-1]["status"]}
+    for metric in ("ready_ms", "import_ms", "create_app_ms", "first_request_ms", "second_request_ms"):
+        result[metric] = round(statistics.median(sample[metric] for sample in samples), 1)
+    return result
+
+
+def slowest_imports(limit):
+    """Modules imported by ``main``, up to two levels down, by cumulative time"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env={**os.environ, "LOG_LEVEL": "WARNING"}, cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    # A module's line follows those of everything it imported, so main's subtree ends at main
+    subtree = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        subtree.append({"module": name.strip(), "depth": depth, "cumulative_ms": round(int(cumulative) / 1000, 1)})
+        if depth == 0:
+            if name.strip() == "main":
+                modules = [m for m in subtree if m["depth"] <= 2]
+            subtree = []
+    return sorted(modules, key=lambda m: -m["cumulative_ms"])[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per scenario and route")
+    parser.add_argument("--route", action="append", help="Route to request first; repeat for several")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenarios to run; default all")
+    parser.add_argument("--imports", type=int, default=10, help="Slowest imports of main to list; 0 skips it")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    fake_dune.add_arguments(parser)
+    parser.set_defaults(rows=200)
+    args = parser.parse_args()
+
+    imports = []
+    if args.imports:
+        imports = slowest_imports(args.imports)
+        for module in imports:
+            print(f"{module['cumulative_ms']:8.1f} ms  {'  ' * module['depth']}{module['module']}")
+
+    server, base_url = fake_dune.start_server(fake_dune.from_arguments(args))
+    results = []
+    try:
+        for scenario in args.scenario or SCENARIOS:
+            for route in args.route or DEFAULT_ROUTES:
+                result = run_scenario(scenario, route, base_url, args.repeat)
+                results.append(result)
+                print(json.dumps(result))
+    finally:
+        server.shutdown()
+
+    if args.output:
+        save(args.output, {"results": results, "imports": imports})
+    if args.baseline:
+        compare(args.baseline, results, ("scenario", "route"),
+                ("ready_ms", "import_ms", "create_app_ms", "first_request_ms"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare one /api/token-report call against calling every route serially.
+
+Usage:
+    python -m benchmarks.bench_token_report [--rounds N] [--output results.json]
+
+Each round uses a fresh token address so neither path is served from the
+result cache.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("CACHE_SHARED_PATH", "")
+
+from api.routes import get_data_service
+from main import create_app
+
+SERIAL_ROUTES = (
+    "/api/transaction-flow",
+    "/api/anomaly-detection",
+    "/api/ownership-concentration",
+    "/api/sell-off-patterns",
+    "/api/volume-brackets",
+    "/api/bot-volume",
+    "/api/post-rug-indicators",
+    "/api/wallet-clustering",
+    "/api/dashboard-summary",
+)
+
+
+def run_serial(client, token_address):
+    started = time.perf_counter()
+    for route in SERIAL_ROUTES:
+        client.get(route, query_string={"token_address": token_address, "launchpad": token_address})
+    return time.perf_counter() - started
+
+
+def run_batched(client, token_address):
+    started = time.perf_counter()
+    client.get("/api/token-report", query_string={"token_address": token_address, "launchpad": token_address})
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    results = {"serial_s": [], "batched_s": []}
+    for _ in range(args.rounds):
+        # dashboard-summary takes no parameters, so clear the cache between rounds
+        get_data_service().dune_service.cache.clear()
+        results["serial_s"].append(run_serial(client, uuid.uuid4().hex))
+        get_data_service().dune_service.cache.clear()
+        results["batched_s"].append(run_batched(client, uuid.uuid4().hex))
+
+    summary = {
+        "rounds": args.rounds,
+        "serial_median_s": round(statistics.median(results["serial_s"]), 3),
+        "batched_median_s": round(statistics.median(results["batched_s"]), 3),
+    }
+    summary["speedup"] = round(summary["serial_median_s"] / summary["batched_median_s"], 2)
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**summary, **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
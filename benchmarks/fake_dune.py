@@ -0,0 +1,253 @@
+"""Local stand-in for the Dune API, for benchmarks and load tests.
+
+Usage:
+    python -m benchmarks.fake_dune [--port 8765] [--latency 0.2] [--rows 1000]
+
+Implements the execute, status and paged results endpoints the
+AsyncDuneClient uses. Executions complete ``--latency`` seconds (plus up to
+``--jitter``) after they start and return ``--rows`` synthetic rows. Every
+row carries the fields of every query the app parses (series, holder
+transfers and token transfers), so one row shape serves all routes. Batch
+executions, whose ``token_addresses`` parameter lists several tokens, return
+``--rows`` rows for each of them. Executions with a ``bucket_seconds``
+parameter (dashboard_activity) return one activity row per time bucket.
+
+Faults can be injected with ``--error-rate`` (HTTP 500), ``--throttle-rate``
+(HTTP 429 with a ``--retry-after`` header), both applied to every request,
+and ``--fail-rate`` (executions ending in QUERY_STATE_FAILED).
+``--rate-limit`` answers 429 to requests beyond a per-minute budget, like
+a Dune plan does. Fault settings are plain attributes and may be changed
+while the server runs.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from services.rate_limit import TokenBucket
+from utils.helpers import format_timestamp, parse_timestamp
+
+
+class FakeDune:
+    """Execution state and fault settings shared by all request handlers"""
+
+    def __init__(self, latency=0.2, jitter=0.0, rows=1000, error_rate=0.0, fail_rate=0.0,
+                 throttle_rate=0.0, retry_after=1, rate_limit=0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rows = rows
+        self.error_rate = error_rate
+        self.fail_rate = fail_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        # Same burst allowance as the client-side limiter for DUNE_RATE_LIMIT_PER_MINUTE
+        self.bucket = TokenBucket(rate_limit / 60, max(1, rate_limit // 6)) if rate_limit else None
+        self.executions = {}
+        self.counts = {"execute": 0, "status": 0, "results": 0, "errors": 0, "throttled": 0, "failed": 0}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def fault(self):
+        """Return an injected ``(status, payload)`` for the current request, or None"""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.throttle_rate or (self.bucket is not None and not self.bucket.try_acquire()):
+                self.counts["throttled"] += 1
+                return 429, {"error": "Too many requests"}
+            if roll < self.throttle_rate + self.error_rate:
+                self.counts["errors"] += 1
+                return 500, {"error": "Internal error"}
+        return None
+
+    def execute(self, query_id, params):
+        with self._lock:
+            self.counts["execute"] += 1
+            execution_id = f"01FAKE{next(self._ids):08d}"
+            failed = self._random.random() < self.fail_rate
+            self.counts["failed"] += failed
+            tokens = (params or {}).get("token_addresses")
+            self.executions[execution_id] = {
+                "query_id": query_id,
+                "params": params,
+                "tokens": tokens.split(",") if tokens else None,
+                "activity": make_activity_rows(params) if (params or {}).get("bucket_seconds") else None,
+                "ready_at": time.monotonic() + self.latency + self._random.uniform(0, self.jitter),
+                "failed": failed,
+            }
+        return 200, {"execution_id": execution_id, "state": "QUERY_STATE_PENDING"}
+
+    def status(self, execution_id):
+        with self._lock:
+            self.counts["status"] += 1
+            execution = self.executions.get(execution_id)
+        if execution is None:
+            return 404, {"error": "Execution not found"}
+        if time.monotonic() < execution["ready_at"]:
+            state = "QUERY_STATE_EXECUTING"
+        elif execution["failed"]:
+            state = "QUERY_STATE_FAILED"
+        else:
+            state = "QUERY_STATE_COMPLETED"
+        return 200, {"execution_id": execution_id, "state": state}
+
+    def results(self, execution_id, limit=None, offset=0):
+        with self._lock:
+            self.counts["results"] += 1
+            execution = self.executions.get(execution_id)
+        if execution is None:
+            return 404, {"error": "Execution not found"}
+        tokens = execution["tokens"]
+        activity = execution["activity"]
+        total = len(activity) if activity is not None else self.rows * len(tokens) if tokens else self.rows
+        end = total if limit is None else min(offset + limit, total)
+        if activity is not None:
+            rows = activity[offset:end]
+        else:
+            rows = [make_row(i, token_address=tokens[i % len(tokens)] if tokens else None) for i in range(offset, end)]
+        payload = {
+            "execution_id": execution_id,
+            "state": "QUERY_STATE_COMPLETED",
+            "result": {"rows": rows, "metadata": {"total_row_count": total}},
+        }
+        if end < total:
+            payload["next_offset"] = end
+        return 200, payload
+
+
+def make_row(i, tokens=50, wallets=500, token_address=None):
+    """Synthetic row ``i`` with series, holder-transfer and token-transfer fields"""
+    day = (date(2025, 1, 1) + timedelta(days=i // tokens % 365)).isoformat()
+    return {
+        "token_address": token_address or f"token{i % tokens}",
+        "date": day,
+        "value": 1000 + (i * 7919) % 500,
+        "seq": i,
+        "block_time": f"{day}T00:00:00Z",
+        "from": "" if i < wallets else f"wallet{(i * 31) % wallets}",
+        "to": f"wallet{(i * 17 + 1) % wallets}",
+        "amount": 1 + (i * 104729) % 1000,
+    }
+
+
+def make_activity_rows(params):
+    """Synthetic dashboard_activity rows for every bucket starting in [since, until)"""
+    bucket_seconds = int(params["bucket_seconds"])
+    first = int(parse_timestamp(params["since"]) // bucket_seconds)
+    end = int(-(-parse_timestamp(params["until"]) // bucket_seconds))
+    rows = []
+    for bucket in range(first, end):
+        transactions = 40 + bucket % 30
+        rows.append({
+            "bucket_start": f"{format_timestamp(bucket * bucket_seconds)}.000 UTC",
+            "transactions": transactions,
+            "bot_transactions": transactions * 2 // 5,
+            "suspicious": bucket % 7,
+            "anomalies": int(bucket % 10 == 0),
+            "active_wallets": 500 + bucket % 100,
+            "whale_concentration": 80 + bucket % 8,
+        })
+    return rows
+
+
+def make_handler(dune):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            fault = dune.fault()
+            if fault:
+                self._send(*fault)
+            elif len(parts) >= 3 and parts[-1] == "execute" and parts[-3] == "query":
+                self._send(*dune.execute(parts[-2], body.get("query_parameters")))
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            query = parse_qs(url.query)
+            fault = dune.fault()
+            if fault:
+                self._send(*fault)
+            elif len(parts) >= 3 and parts[-3] == "execution" and parts[-1] == "status":
+                self._send(*dune.status(parts[-2]))
+            elif len(parts) >= 3 and parts[-3] == "execution" and parts[-1] == "results":
+                limit = int(query["limit"][0]) if "limit" in query else None
+                offset = int(query.get("offset", ["0"])[0])
+                self._send(*dune.results(parts[-2], limit, offset))
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429 and dune.retry_after is not None:
+                self.send_header("Retry-After", str(dune.retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class FakeDuneServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections under load-test concurrency
+    request_queue_size = 1024
+
+
+def start_server(dune, host="127.0.0.1", port=0):
+    """Serve ``dune`` from a daemon thread; returns the server and its API base URL"""
+    server = FakeDuneServer((host, port), make_handler(dune))
+    thread = threading.Thread(target=server.serve_forever, name="fake-dune", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/api/v1"
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds until an execution completes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows returned by every execution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of executions that fail")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with every 429")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per minute before answering 429; 0 is unlimited")
+
+
+def from_arguments(args):
+    return FakeDune(args.latency, args.jitter, args.rows, args.error_rate, args.fail_rate, args.throttle_rate,
+                    args.retry_after, args.rate_limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_server(from_arguments(args), args.host, args.port)
+    print(f"Fake Dune API at {base_url}; set DUNE_USE_API=1 DUNE_API_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
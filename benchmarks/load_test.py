@@ -0,0 +1,317 @@
+"""Load-test every /api route under gunicorn or uvicorn against a local fake Dune API.
+
+Usage:
+    python -m benchmarks.load_test [--server gunicorn|uvicorn] [--workers 2] [--threads 8]
+        [--concurrency 1 8 32]
+        [--requests 200] [--latency 0.2] [--rows 1000] [--output results.json]
+        [--baseline previous.json]
+
+Starts benchmarks.fake_dune in-process and the app in API mode pointed at
+it: ``main:create_app()`` under gunicorn, or ``asgi:app`` under uvicorn with
+``--threads`` as ASGI_THREADS. It then drives each route with a fixed
+number of concurrent clients. Each concurrency level uses its own set of
+``--tokens`` token addresses, so every level sees the same mix of cache
+misses and hits.
+
+Reported per route and level: p50/p95/p99 latency, throughput, errors,
+worker saturation (server-side busy time from the Server-Timing ``total``
+entry, over the worker threads' capacity), /health latency while the
+level runs, and peak RSS of the server and its workers. The fake Dune
+options (--latency, --jitter, --rows, --error-rate, --fail-rate,
+--throttle-rate, --retry-after, --rate-limit) shape the upstream.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks import fake_dune
+from benchmarks.results import compare, percentile, save
+
+ROUTES = {
+    "transaction-flow": "/api/transaction-flow?token_address={token}",
+    "anomaly-detection": "/api/anomaly-detection?token_address={token}",
+    "anomaly-scan": "/api/anomaly-scan?launchpad={token}",
+    "ownership-concentration": "/api/ownership-concentration?token_address={token}",
+    "holder-stats": "/api/holder-stats?token_address={token}",
+    "sell-off-patterns": "/api/sell-off-patterns?token_address={token}",
+    "volume-brackets": "/api/volume-brackets?launchpad={token}",
+    "bot-volume": "/api/bot-volume?token_address={token}",
+    "post-rug-indicators": "/api/post-rug-indicators?token_address={token}",
+    "wallet-clustering": "/api/wallet-clustering?token_address={token}",
+    "dashboard-summary": "/api/dashboard-summary",
+    "token-report": "/api/token-report?token_address={token}&launchpad={token}",
+    "stream": "/api/stream/transaction-flow?token_address={token}",
+}
+
+_TOTAL_TIMING = re.compile(r"(?:^|,\s*)total;dur=([0-9.]+)")
+
+
+class RssSampler:
+    """Track the peak combined RSS of a process and its children"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def reset(self):
+        """Return the peak since the last reset, in MB, and start over"""
+        peak, self.peak_kb = self.peak_kb, 0
+        return round(peak / 1024, 1) if peak else None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, sum(_rss_kb(pid) for pid in _process_tree(self.pid)))
+
+
+class HealthProbe:
+    """Poll /health while a level runs, to show whether the server stays responsive"""
+
+    def __init__(self, base_url, interval=0.1, timeout=30):
+        self.url = f"{base_url}/health"
+        self.interval = interval
+        self.timeout = timeout
+        self.latencies = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="health-probe", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and return the sorted probe latencies in seconds"""
+        self._stop.set()
+        self._thread.join()
+        return sorted(self.latencies)
+
+    def _run(self):
+        session = requests.Session()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                session.get(self.url, timeout=self.timeout)
+            except requests.RequestException:
+                pass
+            self.latencies.append(time.perf_counter() - started)
+
+
+def _process_tree(root):
+    # Linux only: children are found through /proc; elsewhere RSS is not reported
+    pids = [root]
+    try:
+        stats = []
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        stats.append((int(entry), int(f.read().rsplit(")", 1)[1].split()[1])))
+                except (OSError, IndexError, ValueError):
+                    continue
+    except OSError:
+        return pids
+    pids += [pid for pid, ppid in stats if ppid == root]
+    return pids
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, dune_url, workdir):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "DUNE_USE_API": "1",
+        "DUNE_API_KEY": "benchmark",
+        "DUNE_API_BASE_URL": dune_url,
+        "LOG_LEVEL": "WARNING",
+    })
+    # Keep every on-disk tier inside this run's scratch directory
+    for name, path in (
+        ("CACHE_SHARED_PATH", "results.sqlite3"),
+        ("REFRESH_BUDGET_PATH", "budget.sqlite3"),
+        ("DUNE_RATE_LIMIT_PATH", "budget.sqlite3"),
+        ("SERIES_STORE_PATH", "series"),
+        ("HOLDER_INDEX_PATH", "holders"),
+        ("DASHBOARD_AGGREGATES_PATH", "dashboard.json"),
+    ):
+        env.setdefault(name, os.path.join(workdir, path))
+    # Measure the app, not the client-side Dune budget; use --rate-limit to model the plan instead
+    env.setdefault("DUNE_RATE_LIMIT_PER_MINUTE", "0")
+    # The series store parses demo-shaped payloads, not the fake Dune rows
+    env.setdefault("SERIES_STORE_ENABLED", "0")
+
+    if args.server == "uvicorn":
+        env["ASGI_THREADS"] = str(args.threads)
+        command = [
+            sys.executable, "-m", "uvicorn", "asgi:app",
+            "--workers", str(args.workers), "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(args.workers), "--threads", str(args.threads),
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+            "main:create_app()",
+        ]
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{args.server} exited during startup")
+        try:
+            requests.get(f"{base_url}/health", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{args.server} did not start within 30s")
+
+
+def run_level(base_url, route, template, concurrency, total, tokens, capacity):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        url = base_url + template.format(token=f"bench-c{concurrency}-{i % tokens}")
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=300)
+            response.content
+            ok = response.status_code == 200 and not _is_error(response)
+            match = _TOTAL_TIMING.search(response.headers.get("Server-Timing", ""))
+            busy = float(match.group(1)) / 1000 if match else 0.0
+        except requests.RequestException:
+            ok, busy = False, 0.0
+        return time.perf_counter() - started, ok, busy
+
+    probe = HealthProbe(base_url)
+    probe.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    health = probe.stop()
+
+    latencies = sorted(latency for latency, _, _ in samples)
+    return {
+        "route": route,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(1 for _, ok, _ in samples if not ok),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "throughput_rps": round(total / elapsed, 1),
+        "saturation": round(sum(busy for _, _, busy in samples) / (elapsed * capacity), 3),
+        "health_p95_ms": round(percentile(health, 95) * 1000, 1) if health else None,
+        "health_max_ms": round(health[-1] * 1000, 1) if health else None,
+    }
+
+
+def _is_error(response):
+    # Upstream failures come back as 200 with an ``error`` key
+    if not response.headers.get("Content-Type", "").startswith("application/json"):
+        return False
+    try:
+        payload = response.json()
+    except ValueError:
+        return True
+    return isinstance(payload, dict) and "error" in payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn",
+                        help="gunicorn serves main:create_app(), uvicorn serves asgi:app")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and concurrency level")
+    parser.add_argument("--tokens", type=int, default=20, help="Distinct token addresses per level")
+    parser.add_argument("--routes", nargs="+", choices=sorted(ROUTES), default=list(ROUTES))
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    fake_dune.add_arguments(parser)
+    args = parser.parse_args()
+
+    dune = fake_dune.from_arguments(args)
+    server, dune_url = fake_dune.start_server(dune)
+    results = []
+    peak_rss = None
+    with tempfile.TemporaryDirectory(prefix="verdexa-bench-") as workdir:
+        process, base_url = start_server(args, dune_url, workdir)
+        sampler = RssSampler(process.pid)
+        sampler.start()
+        try:
+            for concurrency in args.concurrency:
+                for route in args.routes:
+                    result = run_level(
+                        base_url, route, ROUTES[route], concurrency, args.requests, args.tokens,
+                        args.workers * args.threads,
+                    )
+                    result["peak_rss_mb"] = sampler.reset()
+                    peak_rss = max(peak_rss or 0, result["peak_rss_mb"] or 0) or None
+                    results.append(result)
+                    print(json.dumps(result))
+        finally:
+            sampler.stop()
+            process.terminate()
+            process.wait(timeout=30)
+            server.shutdown()
+
+    summary = {
+        "config": {
+            key: getattr(args, key)
+            for key in ("server", "workers", "threads", "concurrency", "requests", "tokens",
+                        "latency", "jitter", "rows", "error_rate", "fail_rate", "throttle_rate",
+                        "retry_after", "rate_limit")
+        },
+        "peak_rss_mb": peak_rss,
+        "fake_dune": dune.counts,
+        "results": results,
+    }
+    if args.output:
+        save(args.output, summary)
+    if args.baseline:
+        compare(args.baseline, results, ("route", "concurrency"), ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Shared helpers for saving benchmark results and comparing runs across commits."""
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+
+
+def metadata():
+    """Describe the commit and machine a run was taken on"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def save(path, payload):
+    with open(path, "w") as f:
+        json.dump({"metadata": metadata(), **payload}, f, indent=2)
+
+
+def compare(baseline_path, results, key_fields, metrics):
+    """
+    Print the change in ``metrics`` between a saved run and ``results``
+
+    Args:
+        baseline_path (str): JSON file written by an earlier run
+        results (list): Result dicts of this run
+        key_fields (tuple): Fields identifying the same measurement in both runs
+        metrics (tuple): Numeric fields to compare
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {tuple(r.get(k) for k in key_fields): r for r in baseline.get("results", [])}
+    print(f"Compared with {baseline.get('metadata', {}).get('commit') or baseline_path}:")
+    for result in results:
+        key = tuple(result.get(k) for k in key_fields)
+        before = previous.get(key)
+        if before is None:
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {' '.join(str(k) for k in key)}: {', '.join(changes)}")
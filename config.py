@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     
@@ -6,7 +7,152 @@ class Config:
     
     
     DUNE_API_KEY = os.environ.get('DUNE_API_KEY') or '0tef04bg4lx9drtbjwj5jxlmzgfvep0d'
-    DUNE_API_BASE_URL = 'https://api.dune.com/api/v1'
+    DUNE_API_BASE_URL = os.environ.get('DUNE_API_BASE_URL') or 'https://api.dune.com/api/v1'
+    # Serve bundled demo data unless DUNE_USE_API=1
+    DUNE_USE_API = os.environ.get('DUNE_USE_API') == '1'
+    # Maps internal query names to saved Dune query IDs. anomaly_detection, sell_off_patterns and
+    # post_rug_indicators take token_address and days, except with SERIES_STORE_ENABLED, where
+    # the store sends token_address, start_date and end_date (inclusive ISO dates) instead; the
+    # saved queries must accept both sets, as /api/stream/<section> always sends days.
+    DUNE_QUERY_IDS = {
+        'transaction_flow': os.environ.get('DUNE_QUERY_TRANSACTION_FLOW'),
+        'anomaly_detection': os.environ.get('DUNE_QUERY_ANOMALY_DETECTION'),
+        'ownership_concentration': os.environ.get('DUNE_QUERY_OWNERSHIP_CONCENTRATION'),
+        'sell_off_patterns': os.environ.get('DUNE_QUERY_SELL_OFF_PATTERNS'),
+        'volume_brackets': os.environ.get('DUNE_QUERY_VOLUME_BRACKETS'),
+        'bot_volume': os.environ.get('DUNE_QUERY_BOT_VOLUME'),
+        'post_rug_indicators': os.environ.get('DUNE_QUERY_POST_RUG_INDICATORS'),
+        'wallet_clustering': os.environ.get('DUNE_QUERY_WALLET_CLUSTERING'),
+        'dashboard_summary': os.environ.get('DUNE_QUERY_DASHBOARD_SUMMARY'),
+        'dashboard_activity': os.environ.get('DUNE_QUERY_DASHBOARD_ACTIVITY'),
+        # Daily token_address/date/value rows of every token on a launchpad, scored by the anomaly scan
+        'launchpad_token_series': os.environ.get('DUNE_QUERY_LAUNCHPAD_TOKEN_SERIES'),
+        # Raw from/to/amount transfers, streamed into the local graph engine
+        'token_transfers': os.environ.get('DUNE_QUERY_TOKEN_TRANSFERS'),
+        # Transfer deltas after a since_seq cursor, behind the holder index
+        'holder_transfers': os.environ.get('DUNE_QUERY_HOLDER_TRANSFERS'),
+        # Batch variants of per-token queries, taking comma-separated token_addresses
+        'bot_volume_batch': os.environ.get('DUNE_QUERY_BOT_VOLUME_BATCH'),
+        'post_rug_indicators_batch': os.environ.get('DUNE_QUERY_POST_RUG_INDICATORS_BATCH'),
+    }
+    DUNE_MAX_CONCURRENCY = int(os.environ.get('DUNE_MAX_CONCURRENCY') or 64)
+    DUNE_MAX_CONNECTIONS = int(os.environ.get('DUNE_MAX_CONNECTIONS') or 32)
+    DUNE_POLL_INTERVAL = 0.5
+    DUNE_POLL_MAX_INTERVAL = 5
+    DUNE_POLL_TIMEOUT = 120
+    # Rows fetched per request when streaming large result sets
+    DUNE_RESULTS_PAGE_SIZE = int(os.environ.get('DUNE_RESULTS_PAGE_SIZE') or 5000)
+    # Client-side request budget matching the Dune plan, shared by all workers on the host; 0 disables
+    DUNE_RATE_LIMIT_PER_MINUTE = int(os.environ.get('DUNE_RATE_LIMIT_PER_MINUTE', '300'))
+    DUNE_RATE_LIMIT_PATH = os.environ.get('DUNE_RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'verdexa', 'budget.sqlite3'))
+    # Retries of 429s, 5xx responses and connection errors, with exponential backoff and full jitter;
+    # execute POSTs are only retried after a 429 or a failed connect, so an execution never starts twice
+    DUNE_RETRY_ATTEMPTS = int(os.environ.get('DUNE_RETRY_ATTEMPTS', '4'))
+    DUNE_RETRY_BASE_DELAY = 0.5
+    DUNE_RETRY_MAX_DELAY = 10
+    # Failed requests in a row that open the circuit breaker, and seconds before it tries Dune again
+    DUNE_BREAKER_FAILURES = int(os.environ.get('DUNE_BREAKER_FAILURES') or 5)
+    DUNE_BREAKER_RESET_TIMEOUT = int(os.environ.get('DUNE_BREAKER_RESET_TIMEOUT') or 30)
+    # Execution slots, out of DUNE_MAX_CONCURRENCY, that background refreshes may hold at once
+    DUNE_BACKGROUND_CONCURRENCY = int(os.environ.get('DUNE_BACKGROUND_CONCURRENCY') or 4)
     
     
-    CACHE_TIMEOUT = 3600 
\ No newline at end of file
+    CACHE_TIMEOUT = 3600
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 4096)
+    # SQLite file shared by all workers on the host; set CACHE_SHARED_PATH to '' to disable
+    CACHE_SHARED_PATH = os.environ.get('CACHE_SHARED_PATH', os.path.join(tempfile.gettempdir(), 'verdexa', 'results.sqlite3'))
+    # How long past expiry a result may still be served while it is refreshed in the background
+    CACHE_STALE_TIMEOUT = int(os.environ.get('CACHE_STALE_TIMEOUT') or 86400)
+    # Per-query TTL overrides in seconds
+    QUERY_CACHE_TIMEOUTS = {
+        'dashboard_summary': 300,
+        'transaction_flow': 900,
+        'bot_volume': 900,
+    }
+    
+    # Directory for per-query lock files so identical queries run once per host; unset to coalesce per process only
+    SINGLE_FLIGHT_LOCK_DIR = os.environ.get('SINGLE_FLIGHT_LOCK_DIR')
+    
+    # Per-token queries whose misses within QUERY_BATCH_WINDOW seconds share one execution of
+    # their *_batch variant; a window of 0 runs one execution per token. In API mode a query is
+    # only batched once its DUNE_QUERY_*_BATCH ID is set.
+    QUERY_BATCH_QUERIES = ('bot_volume', 'post_rug_indicators')
+    QUERY_BATCH_WINDOW = float(os.environ.get('QUERY_BATCH_WINDOW', '0.05'))
+    QUERY_BATCH_MAX_SIZE = int(os.environ.get('QUERY_BATCH_MAX_SIZE') or 100)
+    # Most token addresses accepted by one POST /api/batch/<section>
+    BATCH_MAX_TOKENS = int(os.environ.get('BATCH_MAX_TOKENS') or 500)
+    
+    # Thread pool size for concurrent sections in /api/token-report
+    REPORT_MAX_WORKERS = int(os.environ.get('REPORT_MAX_WORKERS') or 16)
+    
+    # Background refresh of stale and hot cache entries
+    REFRESH_SCHEDULER_ENABLED = os.environ.get('REFRESH_SCHEDULER_ENABLED', '1') == '1'
+    REFRESH_INTERVAL = 15
+    REFRESH_LEAD_TIME = 120
+    REFRESH_MIN_HITS = 5
+    REFRESH_HOT_HALF_LIFE = 600
+    REFRESH_WORKERS = 2
+    # Upper bound on background Dune executions, shared by all workers through REFRESH_BUDGET_PATH
+    REFRESH_BUDGET_PER_MINUTE = int(os.environ.get('REFRESH_BUDGET_PER_MINUTE') or 30)
+    REFRESH_BUDGET_PATH = os.environ.get('REFRESH_BUDGET_PATH', os.path.join(tempfile.gettempdir(), 'verdexa', 'budget.sqlite3'))
+    
+    # Local store of per-token daily series; only dates missing from it are fetched from Dune.
+    # Off by default in demo mode, whose fixed sample dates never fall inside a live window.
+    SERIES_STORE_ENABLED = os.environ.get('SERIES_STORE_ENABLED', '1' if DUNE_USE_API else '0') == '1'
+    SERIES_STORE_PATH = os.environ.get('SERIES_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'verdexa', 'series')
+    
+    # Transfer graphs kept in memory for the local clustering engine
+    GRAPH_CACHE_ENTRIES = int(os.environ.get('GRAPH_CACHE_ENTRIES') or 8)
+    
+    # Incrementally maintained holder balances behind ownership-concentration and sell-off-patterns.
+    # On by default in API mode once DUNE_QUERY_HOLDER_TRANSFERS is configured.
+    HOLDER_INDEX_ENABLED = os.environ.get(
+        'HOLDER_INDEX_ENABLED', '1' if DUNE_USE_API and DUNE_QUERY_IDS['holder_transfers'] else '0') == '1'
+    HOLDER_INDEX_PATH = os.environ.get('HOLDER_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'verdexa', 'holders'))
+    HOLDER_INDEX_SYNC_INTERVAL = 30
+    HOLDER_INDEX_TRACKED = 20
+    # Token indexes kept in memory; the least recently read are dropped and reloaded from disk
+    HOLDER_INDEX_MAX_TOKENS = int(os.environ.get('HOLDER_INDEX_MAX_TOKENS') or 256)
+    
+    # Dashboard summary from rolling per-bucket counts fetched incrementally (dashboard_activity)
+    # instead of the full dashboard_summary query per call; *Change fields compare consecutive windows
+    DASHBOARD_AGGREGATES_ENABLED = os.environ.get('DASHBOARD_AGGREGATES_ENABLED', '1' if DUNE_USE_API else '0') == '1'
+    DASHBOARD_AGGREGATES_PATH = os.environ.get('DASHBOARD_AGGREGATES_PATH', os.path.join(tempfile.gettempdir(), 'verdexa', 'dashboard.json'))
+    DASHBOARD_REFRESH_INTERVAL = int(os.environ.get('DASHBOARD_REFRESH_INTERVAL') or 60)
+    DASHBOARD_WINDOW = int(os.environ.get('DASHBOARD_WINDOW') or 86400)
+    DASHBOARD_BUCKET = int(os.environ.get('DASHBOARD_BUCKET') or 3600)
+    
+    # Request instrumentation: Server-Timing headers, JSON logs and /metrics
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '1') == '1'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # Fraction of routine per-query log lines kept; warnings and errors are never sampled
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE') or 1.0)
+    # Shared directory where each gunicorn worker exports its histograms for /metrics
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    
+    # JSON responses: 'orjson' when installed, otherwise the standard library encoder
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    # Encoded bodies kept for payloads served repeatedly from the result cache
+    RESPONSE_CACHE_ENTRIES = int(os.environ.get('RESPONSE_CACHE_ENTRIES') or 256)
+    RESPONSE_GZIP_MIN_BYTES = 1024
+    RESPONSE_GZIP_LEVEL = 6
+    
+    # ASGI mode (asgi.py): threads for cached and CPU-bound work, and how many times a
+    # request is redone after awaiting its Dune misses before it may block a thread
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS') or 32)
+    ASGI_MAX_PASSES = 8
+    
+    # Background jobs (POST /api/jobs) for queries that outlast the load balancer's timeout
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'verdexa', 'jobs.sqlite3')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 4)
+    JOB_MAX_QUEUED = 100
+    # Longest a GET /api/jobs/<id>?wait= long-poll is held; keep below the load balancer timeout.
+    # Under WSGI each long-poll holds a worker thread; asgi.py awaits it on the event loop instead.
+    JOB_MAX_WAIT = 25
+    JOB_HEARTBEAT_INTERVAL = 10
+    JOB_RETENTION = 86400
+    
+    # Startup: services are built, and numpy and aiohttp imported, on the first request needing
+    # them. With WARMUP_ON_START=1 create_app does that up front and promotes the shared result
+    # cache and dashboard snapshot into memory, so the first request is served like any other.
+    WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0') == '1'
@@ -1,24 +1,109 @@
-from flask import Flask, jsonify
+import time
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from api.routes import api_bp
+from api.json_provider import TimedJSONProvider, route_label
+from api.routes import api_bp, get_data_service, job_service
 from config import Config
+from services.dune_service import pending_queries
+from services.metrics import (
+    HTTP_QUEUE_SECONDS, HTTP_REQUEST_SECONDS, REGISTRY, TIMED_BY_SERVER, record_timing, server_timing_header,
+    start_request_timings,
+)
+from utils.log import configure_logging
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = TimedJSONProvider(app)
     
+    configure_logging(app.config['LOG_LEVEL'], app.config['LOG_SAMPLE_RATE'])
     
     CORS(app)
     
     
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    job_service.start()
+    
+    if app.config['WARMUP_ON_START']:
+        get_data_service().warm_up()
+    
+    register_metrics(app)
+    
     @app.route('/health')
     def health_check():
         return jsonify({"status": "ok"})
     
     return app
 
+def register_metrics(app):
+    """Time every request, add Server-Timing headers and expose /metrics"""
+    REGISTRY.start_export(app.config['METRICS_DIR'])
+    register_service_gauges()
+    
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        start_request_timings()
+        queued = _queue_seconds(request.headers.get('X-Request-Start'))
+        if queued is not None:
+            HTTP_QUEUE_SECONDS.observe(queued, route=route_label())
+            record_timing("queue", queued)
+    
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        # Passes that only collected deferred Dune queries are redone and their responses dropped
+        if started is None or pending_queries():
+            return response
+        if not request.environ.get(TIMED_BY_SERVER):
+            elapsed = time.perf_counter() - started
+            HTTP_REQUEST_SECONDS.observe(
+                elapsed, route=route_label(), method=request.method, status=response.status_code)
+            record_timing("total", elapsed)
+        header = server_timing_header()
+        if app.config['SERVER_TIMING_ENABLED'] and header:
+            response.headers['Server-Timing'] = header
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def register_service_gauges():
+    """Expose DuneService cache, coalescing, batching, refresh and Dune client counters as gauges"""
+    sections = {
+        "cache": "Result cache counters",
+        "single_flight": "Request coalescing counters",
+        "batch": "Batched per-token query counters",
+        "refresh": "Background refresh counters",
+        "upstream": "Dune API requests, retries and circuit breaker counters",
+    }
+    for section, documentation in sections.items():
+        def collect(section=section):
+            # A scrape shouldn't build the service before any request has
+            data_service = get_data_service(create=False)
+            if data_service is None:
+                return []
+            counters = data_service.dune_service.stats()[section]
+            return [({"counter": name}, value) for name, value in counters.items()
+                    if isinstance(value, (int, float))]
+        REGISTRY.gauge_callback(f"verdexa_{section}", documentation, collect)
+
+def _queue_seconds(header):
+    # Proxies send X-Request-Start as "t=<epoch>" in seconds, milliseconds or microseconds
+    if not header:
+        return None
+    try:
+        started = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(time.time() - started, 0.0)
+
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
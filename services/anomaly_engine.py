@@ -0,0 +1,217 @@
+import warnings
+from contextlib import contextmanager
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Scale factor making the median absolute deviation comparable to a standard deviation
+MAD_SCALE = 1.4826
+MAD_BLOCK_TOKENS = 512
+
+
+def rolling_zscore(values, window):
+    """
+    Score each point against the mean and standard deviation of the
+    ``window`` points before it
+
+    Args:
+        values (ndarray): Series as a (tokens, days) array; NaN marks gaps
+        window (int): Number of preceding points forming the baseline
+
+    Returns:
+        tuple: ``(baseline, scores)`` arrays shaped like ``values``; both are
+        NaN where there is not enough history yet
+    """
+    values = _as_matrix(values)
+    present = ~np.isnan(values)
+    # Centering each series first keeps the sum-of-squares variance numerically stable
+    with _quiet_nan_warnings():
+        center = np.nanmean(values, axis=1, keepdims=True)
+    center = np.where(np.isnan(center), 0.0, center)
+    filled = np.where(present, values - center, 0.0)
+
+    # Prefix sums with a leading zero column give every window sum in one subtraction
+    zeros = np.zeros((values.shape[0], 1))
+    csum = np.concatenate([zeros, np.cumsum(filled, axis=1)], axis=1)
+    csq = np.concatenate([zeros, np.cumsum(filled * filled, axis=1)], axis=1)
+    ccount = np.concatenate([zeros, np.cumsum(present, axis=1)], axis=1)
+
+    baseline = np.full(values.shape, np.nan)
+    scores = np.full(values.shape, np.nan)
+    if values.shape[1] <= window:
+        return baseline, scores
+
+    count = ccount[:, window:-1] - ccount[:, :-window - 1]
+    total = csum[:, window:-1] - csum[:, :-window - 1]
+    total_sq = csq[:, window:-1] - csq[:, :-window - 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+        baseline[:, window:] = mean + center
+        scores[:, window:] = (values[:, window:] - center - mean) / std
+
+    insufficient = np.zeros(values.shape, dtype=bool)
+    insufficient[:, window:] = (count < 2) | (std <= 1e-9 * (np.abs(mean + center) + 1.0))
+    return baseline, _clean(scores, insufficient)
+
+
+def ewma_zscore(values, window):
+    """
+    Score each point against an exponentially weighted mean and variance
+    of the points before it, with a span of ``window`` points
+
+    Returns:
+        tuple: ``(baseline, scores)`` arrays shaped like ``values``
+    """
+    values = _as_matrix(values)
+    alpha = 2.0 / (window + 1)
+    baseline = np.full(values.shape, np.nan)
+    scores = np.full(values.shape, np.nan)
+    if values.shape[1] == 0:
+        return baseline, scores
+
+    mean = values[:, 0].copy()
+    var = np.zeros(values.shape[0])
+    seen = (~np.isnan(mean)).astype(np.int64)
+    # Recurse over days only; each step is vectorized across every token
+    for t in range(1, values.shape[1]):
+        x = values[:, t]
+        ready = seen >= window
+        with np.errstate(invalid="ignore", divide="ignore"):
+            baseline[:, t] = np.where(ready, mean, np.nan)
+            scores[:, t] = np.where(ready, (x - mean) / np.sqrt(var), np.nan)
+
+        present = ~np.isnan(x)
+        first = present & np.isnan(mean)
+        mean = np.where(first, x, mean)
+        update = present & ~first
+        diff = np.where(update, x - mean, 0.0)
+        incr = alpha * diff
+        mean = mean + incr
+        var = np.where(update, (1 - alpha) * (var + diff * incr), var)
+        seen = seen + present
+    return baseline, _clean(scores, np.zeros(values.shape, dtype=bool))
+
+
+def rolling_mad(values, window):
+    """
+    Score each point by its distance from the median of the ``window``
+    points before it, in units of scaled median absolute deviation. Robust
+    to the outliers it is looking for.
+
+    Returns:
+        tuple: ``(baseline, scores)`` arrays shaped like ``values``
+    """
+    values = _as_matrix(values)
+    baseline = np.full(values.shape, np.nan)
+    scores = np.full(values.shape, np.nan)
+    if values.shape[1] <= window:
+        return baseline, scores
+
+    # Work in blocks of tokens so the (tokens, days, window) deviations stay small
+    for start in range(0, values.shape[0], MAD_BLOCK_TOKENS):
+        block = values[start:start + MAD_BLOCK_TOKENS]
+        windows = sliding_window_view(block[:, :-1], window, axis=1)
+        # nanmedian is several times slower than median, so only pay for it when there are gaps
+        median_fn = np.nanmedian if np.isnan(block).any() else np.median
+        with np.errstate(invalid="ignore", divide="ignore"), _quiet_nan_warnings():
+            median = median_fn(windows, axis=2)
+            mad = median_fn(np.abs(windows - median[:, :, None]), axis=2) * MAD_SCALE
+            baseline[start:start + MAD_BLOCK_TOKENS, window:] = median
+            scores[start:start + MAD_BLOCK_TOKENS, window:] = (block[:, window:] - median) / mad
+    return baseline, _clean(scores, np.zeros(values.shape, dtype=bool))
+
+
+DETECTORS = {
+    "zscore": rolling_zscore,
+    "ewma": ewma_zscore,
+    "mad": rolling_mad,
+}
+
+
+def detect(dates, values, detector="zscore", window=7, threshold=3.0):
+    """
+    Find anomalies in one series
+
+    Returns:
+        list: Anomalies shaped like the upstream payload, with ``date``,
+        ``value``, ``type`` ('spike' or 'drop'), ``percentage`` change from
+        the baseline, and the detector ``score``
+    """
+    _check_window(window)
+    series = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    baseline, scores = DETECTORS[detector](series, window)
+    baseline, scores = baseline[0], scores[0]
+
+    anomalies = []
+    for i in np.flatnonzero(np.abs(scores) >= threshold):
+        change = (series[i] - baseline[i]) / baseline[i] * 100 if baseline[i] else None
+        anomalies.append({
+            "date": dates[i],
+            "value": values[i],
+            "type": "spike" if scores[i] > 0 else "drop",
+            "percentage": None if change is None else round(abs(float(change)), 1),
+            "score": round(float(scores[i]), 2),
+        })
+    return anomalies
+
+
+def scan(values, detector="zscore", window=7, threshold=3.0):
+    """
+    Score many series in one batched pass
+
+    Args:
+        values (ndarray): (tokens, days) array; NaN marks gaps
+
+    Returns:
+        dict: Per-token arrays ``anomaly_count``, ``max_score`` (largest
+        absolute score) and ``latest_score`` (score on the last day)
+    """
+    _check_window(window)
+    _, scores = DETECTORS[detector](values, window)
+    abs_scores = np.abs(scores)
+    with _quiet_nan_warnings():
+        max_score = np.nanmax(np.where(np.isnan(abs_scores), -np.inf, abs_scores), axis=1)
+    return {
+        "anomaly_count": (abs_scores >= threshold).sum(axis=1),
+        "max_score": np.where(np.isinf(max_score), np.nan, max_score),
+        "latest_score": scores[:, -1],
+    }
+
+
+def pivot_rows(rows, key="token_address", date="date", value="value"):
+    """
+    Turn ``{token, date, value}`` rows into a dense (tokens, days) matrix
+
+    Returns:
+        tuple: ``(tokens, dates, matrix)`` with NaN where a token has no row
+    """
+    tokens, token_index = np.unique([row[key] for row in rows], return_inverse=True)
+    dates, date_index = np.unique([row[date] for row in rows], return_inverse=True)
+    matrix = np.full((len(tokens), len(dates)), np.nan)
+    matrix[token_index, date_index] = [row[value] for row in rows]
+    return tokens.tolist(), dates.tolist(), matrix
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[None, :] if values.ndim == 1 else values
+
+
+def _check_window(window):
+    # Every detector needs at least one point of history to score against
+    if not isinstance(window, (int, np.integer)) or window < 1:
+        raise ValueError(f"window must be a positive integer, got {window!r}")
+
+
+def _clean(scores, insufficient):
+    # Zero spread or too little history gives inf/NaN scores; neither is an anomaly
+    scores[insufficient | ~np.isfinite(scores)] = np.nan
+    return scores
+
+
+@contextmanager
+def _quiet_nan_warnings():
+    # nanmedian/nanmax warn on all-NaN slices, which are expected for gaps
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
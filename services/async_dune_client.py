@@ -0,0 +1,364 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from config import Config
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import (
+    DUNE_EXECUTE_SECONDS, DUNE_POLL_SECONDS, DUNE_RESULTS_SECONDS, DUNE_WAIT_SECONDS, timed,
+)
+from services.rate_limit import BACKGROUND, INTERACTIVE, PriorityRateLimiter, SharedTokenBucket, TokenBucket
+
+TERMINAL_FAILURE_STATES = ("QUERY_STATE_FAILED", "QUERY_STATE_CANCELLED", "QUERY_STATE_EXPIRED")
+UNAVAILABLE = "Dune API is unavailable; retrying after the circuit breaker resets"
+
+
+class AsyncDuneClient:
+    """asyncio client for the Dune API.
+
+    All requests go through one pooled keep-alive ``aiohttp`` session, so
+    executions after the first reuse open TCP/TLS connections. Polling backs
+    off adaptively instead of sleeping a fixed interval, and a semaphore caps
+    how many executions are in flight at once.
+
+    Every request draws from a rate limiter sized to the Dune plan, where
+    interactive callers go ahead of background refreshes. 429s, 5xx
+    responses and connection errors are retried with exponential backoff and
+    jitter, except that a new execution is only retried when Dune cannot
+    have started it. A circuit breaker stops new executions while Dune keeps
+    failing.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=None, max_connections=None,
+                 poll_interval=None, poll_max_interval=None, poll_timeout=None,
+                 limiter=None, breaker=None, retry_attempts=None):
+        self.api_key = api_key or Config.DUNE_API_KEY
+        self.base_url = (base_url or Config.DUNE_API_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency or Config.DUNE_MAX_CONCURRENCY
+        self.max_connections = max_connections or Config.DUNE_MAX_CONNECTIONS
+        self.poll_interval = poll_interval or Config.DUNE_POLL_INTERVAL
+        self.poll_max_interval = poll_max_interval or Config.DUNE_POLL_MAX_INTERVAL
+        self.poll_timeout = poll_timeout or Config.DUNE_POLL_TIMEOUT
+        self.retry_attempts = retry_attempts if retry_attempts is not None else Config.DUNE_RETRY_ATTEMPTS
+        self.retry_base_delay = Config.DUNE_RETRY_BASE_DELAY
+        self.retry_max_delay = Config.DUNE_RETRY_MAX_DELAY
+        self.limiter = limiter or self._default_limiter()
+        self.breaker = breaker or CircuitBreaker(Config.DUNE_BREAKER_FAILURES, Config.DUNE_BREAKER_RESET_TIMEOUT)
+        self._stats = {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0, "connection_errors": 0}
+
+        # Created lazily so they bind to the loop the client is used from
+        self._session = None
+        self._semaphore = None
+        self._background_semaphore = None
+
+    @staticmethod
+    def _default_limiter():
+        per_minute = Config.DUNE_RATE_LIMIT_PER_MINUTE
+        if per_minute <= 0:
+            return PriorityRateLimiter()
+        rate = per_minute / 60
+        capacity = max(1, per_minute // 6)
+        if Config.DUNE_RATE_LIMIT_PATH:
+            return PriorityRateLimiter(SharedTokenBucket(Config.DUNE_RATE_LIMIT_PATH, "dune", rate, capacity), rate)
+        return PriorityRateLimiter(TokenBucket(rate, capacity), rate)
+
+    def _get_headers(self):
+        return {
+            "x-dune-api-key": self.api_key,
+            "Content-Type": "application/json"
+        }
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            # aiohttp is the heaviest import in the app; only workers that reach Dune pay for it
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self._get_headers(),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._background_semaphore = asyncio.Semaphore(
+                min(Config.DUNE_BACKGROUND_CONCURRENCY, self.max_concurrency))
+        return self._session
+
+    async def open(self):
+        """Create the pooled session ahead of the first request"""
+        await self._get_session()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def stats(self):
+        """Return request, retry and circuit breaker counters"""
+        breaker = self.breaker.stats()
+        return {
+            **self._stats,
+            "breaker_open": breaker["open"],
+            "breaker_opened": breaker["opened"],
+            "breaker_rejected": breaker["rejected"],
+        }
+
+    @asynccontextmanager
+    async def _execution_slot(self, priority):
+        await self._get_session()
+        # Background work may only hold a few of the slots, so interactive misses always find one
+        if priority == BACKGROUND:
+            async with self._background_semaphore, self._semaphore:
+                yield
+        else:
+            async with self._semaphore:
+                yield
+
+    async def _request(self, method, path, priority=INTERACTIVE, idempotent=True, **kwargs):
+        """
+        Send one API request, retrying transient failures
+
+        Each attempt waits for the rate limiter. 429s, 5xx responses and
+        connection errors are retried up to ``retry_attempts`` times after a
+        random delay of up to ``retry_base_delay * 2 ** attempt`` seconds, or
+        after the server's Retry-After; a 429 also pauses the limiter for
+        every other caller. The outcome is reported to the circuit breaker.
+
+        Requests that are not idempotent are only retried after a 429 or a
+        failure to connect, since a 5xx or a dropped connection may come
+        after the server acted on them.
+
+        Args:
+            method (str): HTTP method
+            path (str): Path below ``base_url``
+            priority (int): INTERACTIVE or BACKGROUND
+            idempotent (bool): Whether repeating the request is harmless
+
+        Returns:
+            tuple: ``(status, body)`` with the decoded JSON on 200, otherwise
+            the response text. ``status`` is None if no response arrived.
+        """
+        import aiohttp
+        session = await self._get_session()
+        for attempt in range(self.retry_attempts + 1):
+            await self.limiter.acquire(priority)
+            self._stats["requests"] += 1
+            retry_after = None
+            sent = True
+            try:
+                async with session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                    status = response.status
+                    body = await response.json() if status == 200 else await response.text()
+                    retry_after = _retry_after(response.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = None, f"Dune API request failed: {e!r}"
+                # The request never reached the server if no connection could be opened
+                sent = not isinstance(e, aiohttp.ClientConnectorError)
+
+            if status is not None and status != 429 and status < 500:
+                # Any answer short of throttling or a server error means Dune is up
+                self.breaker.record_success()
+                return status, body
+
+            if status == 429:
+                self._stats["throttled"] += 1
+            elif status is None:
+                self._stats["connection_errors"] += 1
+            else:
+                self._stats["server_errors"] += 1
+            if attempt == self.retry_attempts or (not idempotent and status != 429 and sent):
+                break
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+            if retry_after is not None:
+                delay = min(retry_after, self.retry_max_delay)
+            if status == 429:
+                self.limiter.pause(delay)
+            self._stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+        self.breaker.record_failure()
+        return status, body
+
+    async def execute_query(self, query_id, params=None, priority=INTERACTIVE):
+        """
+        Execute a query and wait for its results
+
+        Args:
+            query_id (int): ID of the query
+            params (dict): Query parameters
+            priority (int): INTERACTIVE for requests a user is waiting on,
+                BACKGROUND for cache refreshes
+
+        Returns:
+            dict: Query results, or a dict with an ``error`` key
+        """
+        if not self.breaker.allow():
+            return {"error": UNAVAILABLE}
+        async with self._execution_slot(priority):
+            with timed(DUNE_EXECUTE_SECONDS, query_id=query_id):
+                execution_id, error = await self.execute(query_id, params, priority)
+            if error:
+                return {"error": error}
+
+            with timed(DUNE_WAIT_SECONDS, query_id=query_id):
+                state, error = await self.wait_for_completion(execution_id, query_id, priority)
+            if error:
+                return {"error": error}
+
+            with timed(DUNE_RESULTS_SECONDS, query_id=query_id):
+                return await self.get_results(execution_id, priority)
+
+    async def execute(self, query_id, params=None, priority=INTERACTIVE):
+        """Start an execution. Returns ``(execution_id, error)``."""
+        execution_params = {"query_parameters": params} if params else {}
+        # A retried POST after Dune accepted the first one would start a second execution
+        status, body = await self._request(
+            "POST", f"/query/{query_id}/execute", priority, idempotent=False, json=execution_params)
+        if status != 200:
+            return None, f"Failed to execute query: {body}"
+        return body.get("execution_id"), None
+
+    async def get_status(self, execution_id, priority=INTERACTIVE):
+        """Return ``(state, error)`` for an execution"""
+        status, body = await self._request("GET", f"/execution/{execution_id}/status", priority)
+        if status != 200:
+            return None, f"Failed to get execution status: {body}"
+        return body.get("state"), None
+
+    async def wait_for_completion(self, execution_id, query_id=None, priority=INTERACTIVE):
+        """
+        Poll an execution until it finishes
+
+        The first poll happens after ``poll_interval`` seconds and the delay
+        grows by half each round up to ``poll_max_interval``, so short queries
+        return quickly while long ones don't hammer the status endpoint.
+
+        Args:
+            execution_id (str): ID of the execution
+            query_id (int): Query the execution belongs to, used to label
+                poll latency metrics
+            priority (int): INTERACTIVE or BACKGROUND
+
+        Returns:
+            tuple: ``(state, error)``
+        """
+        delay = self.poll_interval
+        deadline = time.monotonic() + self.poll_timeout
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+
+            with timed(DUNE_POLL_SECONDS, query_id=query_id):
+                state, error = await self.get_status(execution_id, priority)
+            if error:
+                return None, error
+            if state == "QUERY_STATE_COMPLETED":
+                return state, None
+            if state in TERMINAL_FAILURE_STATES:
+                return state, f"Query execution failed or was cancelled. Status: {state}"
+
+            delay = min(delay * 1.5, self.poll_max_interval)
+
+        return None, "Query execution timed out"
+
+    async def stream_query(self, query_id, params=None, page_size=None, priority=INTERACTIVE):
+        """
+        Execute a query and yield its result rows page by page
+
+        Only one page of rows is held in memory at a time, however large the
+        full result set is.
+
+        Yields:
+            list: Rows of each page. Errors are yielded as a single-element
+            list holding a dict with an ``error`` key.
+        """
+        if not self.breaker.allow():
+            yield [{"error": UNAVAILABLE}]
+            return
+        async with self._execution_slot(priority):
+            execution_id, error = await self.execute(query_id, params, priority)
+            if not error:
+                state, error = await self.wait_for_completion(execution_id, query_id, priority)
+        if error:
+            yield [{"error": error}]
+            return
+
+        async for rows in self.iter_result_pages(execution_id, page_size, priority):
+            yield rows
+
+    async def iter_result_pages(self, execution_id, page_size=None, priority=INTERACTIVE):
+        """Yield the rows of a finished execution using limit/offset paging"""
+        page_size = page_size or Config.DUNE_RESULTS_PAGE_SIZE
+        offset = 0
+
+        while offset is not None:
+            status, payload = await self._request(
+                "GET", f"/execution/{execution_id}/results", priority,
+                params={"limit": page_size, "offset": offset},
+            )
+            if status != 200:
+                yield [{"error": f"Failed to get query results: {payload}"}]
+                return
+
+            rows = payload.get("result", {}).get("rows", [])
+            if rows:
+                yield rows
+
+            next_offset = payload.get("next_offset")
+            if next_offset is None and len(rows) == page_size:
+                next_offset = offset + page_size
+            offset = next_offset if rows else None
+
+    async def get_results(self, execution_id, priority=INTERACTIVE):
+        status, body = await self._request("GET", f"/execution/{execution_id}/results", priority)
+        if status != 200:
+            return {"error": f"Failed to get query results: {body}"}
+        return body
+
+
+def _retry_after(value):
+    """Parse a Retry-After header given in seconds; HTTP dates are ignored"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class BackgroundLoop:
+    """Event loop running in a daemon thread, for calling coroutines from sync code"""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever, name="dune-client-loop", daemon=True)
+                thread.start()
+        return self._loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the background loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and block until it completes"""
+        return self.submit(coro).result()
+
+    async def run_async(self, coro):
+        """Await a coroutine on the background loop from another event loop"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def iterate(self, agen):
+        """Consume an async generator from sync code, one item at a time"""
+        loop = self._ensure_loop()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Stop upstream paging if the consumer goes away early
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
@@ -0,0 +1,231 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+FRESH = "fresh"
+STALE = "stale"
+
+def make_cache_key(query_id, params=None):
+    """Build a stable cache key from a query ID and its parameters.
+
+    Parameters set to None are dropped and the remaining keys are sorted, so
+    ``{"days": 7, "token_address": None}`` and ``{"days": 7}`` share an entry.
+    """
+    normalized = {str(k): v for k, v in (params or {}).items() if v is not None}
+    return f"{query_id}:{json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)}"
+
+
+class SharedCache:
+    """SQLite-backed cache tier shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, stale_until REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return ``(value, expires_at, stale_until)`` for a servable entry, or None"""
+        row = self._connect().execute(
+            "SELECT value, expires_at, stale_until FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(self, key, value, expires_at, stale_until):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), expires_at, stale_until),
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def entries(self, limit):
+        """Return up to ``limit`` servable entries as ``(key, value, expires_at, stale_until)``, latest expiry first"""
+        rows = self._connect().execute(
+            "SELECT key, value, expires_at, stale_until FROM results WHERE stale_until > ? "
+            "ORDER BY expires_at DESC LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [(key, json.loads(value), expires_at, stale_until) for key, value, expires_at, stale_until in rows]
+
+    def purge_expired(self):
+        self._connect().execute("DELETE FROM results WHERE stale_until <= ?", (time.time(),))
+
+
+class ResultCache:
+    """Two-tier cache for Dune query results.
+
+    The first tier is an in-process LRU with per-entry expiry. The optional
+    second tier is a SQLite file shared across gunicorn workers; entries
+    found there are promoted into the local tier.
+
+    Expired entries are kept for a further ``stale_timeout`` seconds so
+    callers can serve them while a refresh runs (stale-while-revalidate).
+    """
+
+    def __init__(self, max_entries=None, default_timeout=None, timeouts=None, shared_path=None,
+                 stale_timeout=None):
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self.default_timeout = default_timeout or Config.CACHE_TIMEOUT
+        self.stale_timeout = Config.CACHE_STALE_TIMEOUT if stale_timeout is None else stale_timeout
+        self.timeouts = dict(Config.QUERY_CACHE_TIMEOUTS if timeouts is None else timeouts)
+        shared_path = shared_path if shared_path is not None else Config.CACHE_SHARED_PATH
+        self.shared = SharedCache(shared_path) if shared_path else None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def timeout_for(self, query_id):
+        """Return the TTL in seconds for a query, honoring per-query overrides"""
+        return self.timeouts.get(query_id, self.default_timeout)
+
+    def get(self, query_id, params=None):
+        """
+        Look up a fresh cached result
+
+        Args:
+            query_id (str): ID of the query
+            params (dict): Query parameters
+
+        Returns:
+            tuple: ``(True, value)`` on a hit, ``(False, None)`` on a miss
+        """
+        status, value = self.lookup(query_id, params)
+        return status == FRESH, value
+
+    def lookup(self, query_id, params=None, allow_stale=False):
+        """
+        Look up a cached result, optionally accepting an expired one
+
+        Returns:
+            tuple: ``(status, value)`` where status is FRESH, STALE or None
+        """
+        key = make_cache_key(query_id, params)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, stale_until = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return FRESH, value
+                if stale_until <= now:
+                    del self._entries[key]
+                    self._stats["expirations"] += 1
+                    entry = None
+
+        if self.shared is not None:
+            shared_entry = self.shared.get(key)
+            if shared_entry is not None and (shared_entry[1] > now or entry is None):
+                entry = shared_entry
+                with self._lock:
+                    self._store_local(key, *shared_entry)
+                    if shared_entry[1] > now:
+                        self._stats["shared_hits"] += 1
+                        return FRESH, shared_entry[0]
+
+        with self._lock:
+            if entry is not None and allow_stale:
+                self._stats["stale_hits"] += 1
+                return STALE, entry[0]
+            self._stats["misses"] += 1
+        return None, None
+
+    def expires_at(self, query_id, params=None):
+        """Return when the cached entry stops being fresh, or None if absent"""
+        key = make_cache_key(query_id, params)
+        with self._lock:
+            entry = self._entries.get(key)
+        candidates = [entry[1]] if entry is not None else []
+        if self.shared is not None:
+            # Another worker may have refreshed the entry since it was promoted here
+            shared_entry = self.shared.get(key)
+            if shared_entry is not None:
+                candidates.append(shared_entry[1])
+        return max(candidates) if candidates else None
+
+    def set(self, query_id, params, value):
+        """Store a result in every tier. Error payloads are never cached."""
+        if isinstance(value, dict) and "error" in value:
+            return
+        key = make_cache_key(query_id, params)
+        expires_at = time.time() + self.timeout_for(query_id)
+        stale_until = expires_at + self.stale_timeout
+
+        with self._lock:
+            self._store_local(key, value, expires_at, stale_until)
+        if self.shared is not None:
+            self.shared.set(key, value, expires_at, stale_until)
+
+    def warm(self):
+        """
+        Promote the shared tier's servable entries into the local tier
+
+        Entries expiring last are kept when there are more than fit. Keys
+        already held locally are left alone.
+
+        Returns:
+            int: Number of entries promoted
+        """
+        if self.shared is None:
+            return 0
+        entries = self.shared.entries(self.max_entries)
+        promoted = 0
+        with self._lock:
+            # Oldest first, so the entries expiring last end up most recently used
+            for key, value, expires_at, stale_until in reversed(entries):
+                if key not in self._entries:
+                    self._store_local(key, value, expires_at, stale_until)
+                    promoted += 1
+        return promoted
+
+    def invalidate(self, query_id, params=None):
+        key = make_cache_key(query_id, params)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current entry count"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+    def _store_local(self, key, value, expires_at, stale_until):
+        # Caller must hold self._lock
+        self._entries[key] = (value, expires_at, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
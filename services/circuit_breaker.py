@@ -0,0 +1,67 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling an unhealthy upstream for a while after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow`` refuses calls for ``reset_timeout`` seconds. Then a single
+    trial call is let through: success closes the breaker, failure opens it
+    again for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def is_open(self):
+        """True while calls are being refused, without claiming a trial call"""
+        with self._lock:
+            return self.state != CLOSED and time.monotonic() - self._changed_at < self.reset_timeout
+
+    def allow(self):
+        """Return True if a call may go ahead"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            # Once the timeout passes, let one trial through; a trial that never
+            # reports back is replaced after another timeout
+            if time.monotonic() - self._changed_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._changed_at = time.monotonic()
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self.state = OPEN
+                self._changed_at = time.monotonic()
+                self._stats["opened"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "open": int(self.state != CLOSED),
+                "consecutive_failures": self._failures,
+                **self._stats,
+            }
@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import threading
+import time
+from config import Config
+from utils.helpers import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Columns of the dashboard_activity query, one row per time bucket
+METRICS = ("transactions", "bot_transactions", "suspicious", "anomalies", "active_wallets", "whale_concentration")
+
+
+class RollingWindow:
+    """Ring of time buckets holding two adjacent windows of one metric.
+
+    Buckets are numbered ``epoch // bucket_seconds``; the newest is ``head``.
+    The current window is the ``buckets`` buckets up to and including head,
+    the previous window the ``buckets`` before those. Running sums of both
+    windows are adjusted whenever a bucket is set or the head moves, so
+    reading them is O(1) and sliding forward costs O(1) per bucket passed.
+    Gauge-like metrics read single buckets through ``value_at`` instead.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.size = 2 * buckets
+        self.values = [None] * self.size
+        self.head = None
+        self.latest = None
+        self.current = 0.0
+        self.previous = 0.0
+
+    def set(self, bucket, value):
+        """Set a bucket's value, replacing any earlier value for it"""
+        if self.head is None or bucket > self.head:
+            self.advance(bucket)
+        if bucket <= self.head - self.size:
+            return
+        i = bucket % self.size
+        delta = value - (self.values[i] or 0.0)
+        self.values[i] = value
+        if bucket > self.head - self.buckets:
+            self.current += delta
+        else:
+            self.previous += delta
+        if self.latest is None or bucket > self.latest:
+            self.latest = bucket
+
+    def advance(self, bucket):
+        """Slide both windows forward so ``bucket`` is the newest"""
+        if self.head is None or bucket - self.head >= self.size:
+            self.values = [None] * self.size
+            self.current = self.previous = 0.0
+            self.head = bucket
+            return
+        while self.head < bucket:
+            self.head += 1
+            # The oldest bucket leaves the previous window and its slot becomes the new head
+            i = self.head % self.size
+            self.previous -= self.values[i] or 0.0
+            self.values[i] = None
+            # The oldest bucket of the current window moves into the previous one
+            moved = self.values[(self.head - self.buckets) % self.size] or 0.0
+            self.current -= moved
+            self.previous += moved
+
+    def value_at(self, bucket):
+        """Return the value of a bucket still in the ring, or None"""
+        if bucket is None or self.head is None or not self.head - self.size < bucket <= self.head:
+            return None
+        return self.values[bucket % self.size]
+
+    def to_dict(self):
+        return {"head": self.head, "latest": self.latest, "values": self.values}
+
+    @classmethod
+    def from_dict(cls, buckets, data):
+        window = cls(buckets)
+        window.head = data["head"]
+        window.latest = data["latest"]
+        window.values = list(data["values"])
+        if window.head is not None:
+            for bucket in range(window.head - window.size + 1, window.head + 1):
+                value = window.values[bucket % window.size] or 0.0
+                if bucket > window.head - buckets:
+                    window.current += value
+                else:
+                    window.previous += value
+        return window
+
+
+class DashboardAggregates:
+    """Dashboard summary computed from rolling per-bucket activity counts.
+
+    Instead of running the full dashboard_summary query per call, only the
+    buckets since the newest one held are fetched, at most every
+    ``DASHBOARD_REFRESH_INTERVAL`` seconds, and folded into a
+    ``RollingWindow`` per metric. Counts are summed over the last
+    ``DASHBOARD_WINDOW`` seconds and compared with the window before it;
+    active wallets and whale concentration are taken from the newest bucket.
+
+    Requests always read the current state; a due refresh runs in the
+    background. The state is saved to ``DASHBOARD_AGGREGATES_PATH`` after
+    every refresh, so a restarted worker, or another worker on the host,
+    starts from the snapshot instead of refetching both windows.
+    """
+
+    def __init__(self, fetch_activity, path=None, window=None, bucket_seconds=None, interval=None):
+        self._fetch_activity = fetch_activity
+        self.path = path if path is not None else Config.DASHBOARD_AGGREGATES_PATH
+        self.bucket_seconds = bucket_seconds or Config.DASHBOARD_BUCKET
+        self.window_buckets = max(1, (window or Config.DASHBOARD_WINDOW) // self.bucket_seconds)
+        self.interval = interval or Config.DASHBOARD_REFRESH_INTERVAL
+        self.windows = {name: RollingWindow(self.window_buckets) for name in METRICS}
+        self.synced_at = 0.0
+
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def summary(self):
+        """
+        Return the dashboard summary from the rolling windows
+
+        Only the very first call, with no snapshot on disk, waits for Dune.
+
+        Returns:
+            dict: Summary fields, or the fetch error if nothing is loaded yet
+        """
+        self.load()
+        if not self.synced_at:
+            error = self.sync()
+            if error is not None and not self.synced_at:
+                return error
+        elif time.time() - self.synced_at >= self.interval:
+            self._refresh_in_background()
+        with self._lock:
+            return self._summary()
+
+    def load(self):
+        """Adopt the snapshot on disk, once, without fetching anything"""
+        if not self._loaded:
+            with self._sync_lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+
+    def sync(self):
+        """
+        Fold the buckets since the newest one held into the windows
+
+        The newest bucket is fetched again, since it may still have been
+        accumulating. A snapshot another worker saved within the refresh
+        interval is adopted instead of fetching.
+
+        Returns:
+            dict: The fetch error, or None
+        """
+        with self._sync_lock:
+            now = time.time()
+            if now - self.synced_at < self.interval or self._load():
+                return None
+            # Aligning the end to the interval lets every worker share the same cached fetch
+            until = now - now % self.interval
+            head = self.windows["transactions"].head
+            since = until - 2 * self.window_buckets * self.bucket_seconds
+            if head is not None:
+                since = max(since, head * self.bucket_seconds)
+
+            rows = self._fetch_activity(since, until, self.bucket_seconds)
+            if isinstance(rows, dict) and "error" in rows:
+                return rows
+            with self._lock:
+                for row in rows:
+                    bucket = int(parse_timestamp(row["bucket_start"]) // self.bucket_seconds)
+                    for name, window in self.windows.items():
+                        if row.get(name) is not None:
+                            window.set(bucket, float(row[name]))
+                newest = int((until - 1) // self.bucket_seconds)
+                for window in self.windows.values():
+                    window.advance(newest)
+                self.synced_at = now
+            self._save()
+            return None
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Dashboard aggregates refresh failed")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="dashboard-aggregates", daemon=True).start()
+
+    def _summary(self):
+        transactions = self.windows["transactions"]
+        bots = self.windows["bot_transactions"]
+        suspicious = self.windows["suspicious"]
+        wallets = self.windows["active_wallets"]
+        whales = self.windows["whale_concentration"]
+        active_wallets = wallets.value_at(wallets.latest)
+        earlier_wallets = None if wallets.latest is None else wallets.value_at(wallets.latest - self.window_buckets)
+        return {
+            "totalTransactions": int(transactions.current),
+            "transactionsChange": _change(transactions.current, transactions.previous),
+            "activeWallets": int(active_wallets or 0),
+            "walletsChange": _change(active_wallets, earlier_wallets),
+            "suspiciousActivity": int(suspicious.current),
+            "suspiciousChange": _change(suspicious.current, suspicious.previous),
+            "botPercentage": round(bots.current / transactions.current * 100, 1) if transactions.current else 0.0,
+            "whaleConcentration": round(whales.value_at(whales.latest) or 0.0, 1),
+            "anomalyCount": int(self.windows["anomalies"].current),
+        }
+
+    def _load(self):
+        """Adopt the snapshot on disk if it is newer than the state held. Returns True if it is also fresh."""
+        if not self.path:
+            return False
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        # Snapshots taken with other bucket settings don't line up with these windows
+        if (data.get("bucket_seconds") != self.bucket_seconds or data.get("window_buckets") != self.window_buckets
+                or data["synced_at"] <= self.synced_at):
+            return False
+        windows = {name: RollingWindow.from_dict(self.window_buckets, data["windows"][name]) for name in METRICS}
+        with self._lock:
+            self.windows = windows
+            self.synced_at = data["synced_at"]
+        return time.time() - self.synced_at < self.interval
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {
+                "bucket_seconds": self.bucket_seconds,
+                "window_buckets": self.window_buckets,
+                "synced_at": self.synced_at,
+                "windows": {name: window.to_dict() for name, window in self.windows.items()},
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+def _change(current, previous):
+    """Percent change from the previous period, 0 when there is nothing to compare with"""
+    if current is None or not previous:
+        return 0.0
+    return round((current - previous) / previous * 100, 1)
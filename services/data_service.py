@@ -1,46 +1,505 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.cache_service import ResultCache
+from services.dashboard_aggregates import DashboardAggregates
 from services.dune_service import DuneService
+from services.holder_index import HolderIndexRegistry
+from services.metrics import instrumented
+from utils.helpers import format_timestamp, generate_date_range, iter_dune_rows
+
+logger = logging.getLogger(__name__)
+
+# Sections available in a token report, keyed by their /api route name
+REPORT_SECTIONS = (
+    "transaction-flow",
+    "anomaly-detection",
+    "ownership-concentration",
+    "sell-off-patterns",
+    "volume-brackets",
+    "bot-volume",
+    "post-rug-indicators",
+    "wallet-clustering",
+    "dashboard-summary",
+)
+
+# Query behind each report section
+SECTION_QUERIES = {name: name.replace("-", "_") for name in REPORT_SECTIONS}
+
+# DataService method behind each section that can run as a background job
+SECTION_METHODS = {
+    "transaction-flow": "get_transaction_flow_data",
+    "anomaly-detection": "get_anomaly_data",
+    "anomaly-scan": "scan_launchpad_anomalies",
+    "ownership-concentration": "get_ownership_data",
+    "holder-stats": "get_holder_stats",
+    "sell-off-patterns": "get_sell_off_data",
+    "volume-brackets": "get_volume_bracket_data",
+    "bot-volume": "get_bot_volume_data",
+    "post-rug-indicators": "get_post_rug_data",
+    "wallet-clustering": "get_wallet_clustering_data",
+    "dashboard-summary": "get_dashboard_summary",
+    "token-report": "get_token_report",
+}
+
+# Type of every section parameter; job params are checked against it, and numbers given
+# as strings are read like the routes read query-string args
+SECTION_PARAM_TYPES = {
+    "token_address": str,
+    "launchpad": str,
+    "detector": str,
+    "method": str,
+    "cluster": str,
+    "sections": list,
+    "days": int,
+    "window": int,
+    "limit": int,
+    "top_n": int,
+    "top_k": int,
+    "max_links": int,
+    "threshold": float,
+    "min_weight": float,
+}
+
+# Section parameters that must be at least 1 when given
+POSITIVE_PARAMS = ("days", "window", "limit", "top_k", "max_links")
+
+# DataService method taking a list of token addresses behind each section of POST /api/batch/<section>
+BATCH_SECTIONS = {
+    "bot-volume": "get_bot_volume_batch",
+    "post-rug-indicators": "get_post_rug_batch",
+}
 
 class DataService:
     def __init__(self):
         self.dune_service = DuneService()
+        self._series_store = None
+        self._series_store_lock = threading.Lock()
+        # Built graphs and their cluster labels are too large for the shared tier
+        self.graph_cache = ResultCache(max_entries=Config.GRAPH_CACHE_ENTRIES, timeouts={}, shared_path="")
+        self.holder_indexes = HolderIndexRegistry(self._fetch_holder_transfers)
+        self.dashboard_aggregates = DashboardAggregates(self._fetch_dashboard_activity)
+        self._report_executor = ThreadPoolExecutor(
+            max_workers=Config.REPORT_MAX_WORKERS,
+            thread_name_prefix="token-report",
+        )
     
-    def get_transaction_flow_data(self, token_address=None):
-        """Get transaction flow data for a token"""
-        # In a real implementation, this would use the token_address to filter data
-        # For now, we just pass a query ID to get dummy data
-        return self.dune_service.execute_query("transaction_flow", {"token_address": token_address})
+    @property
+    def series_store(self):
+        # Report sections run concurrently, and they must all share one store and its locks
+        if self._series_store is None:
+            with self._series_store_lock:
+                if self._series_store is None:
+                    from services.series_store import SeriesStore
+                    self._series_store = SeriesStore()
+        return self._series_store
     
-    def get_anomaly_data(self, token_address=None, days=14):
-        """Get anomaly detection data for a token"""
-        params = {"token_address": token_address, "days": days}
-        return self.dune_service.execute_query("anomaly_detection", params)
+    def warm_up(self):
+        """
+        Load what the first requests would otherwise wait on
+        
+        Imports the numpy-based engines and the Dune HTTP client, which are
+        otherwise deferred to the first request needing them, promotes the
+        shared cache tier into the local one and loads the dashboard snapshot.
+        
+        Returns:
+            dict: Cache entries promoted and seconds taken
+        """
+        started = time.perf_counter()
+        # Importing them is the point; numpy alone takes ~100ms on a cold worker
+        from services import anomaly_engine, graph_engine
+        self.series_store
+        promoted = self.dune_service.warm_up()
+        if Config.DASHBOARD_AGGREGATES_ENABLED:
+            self.dashboard_aggregates.load()
+        stats = {"cache_entries": promoted, "seconds": round(time.perf_counter() - started, 3)}
+        logger.info("Warmed up data service", extra={"fields": stats})
+        return stats
+    
+    @instrumented
+    def get_transaction_flow_data(self, token_address=None, top_k=None, min_weight=None, max_links=None, cluster=None):
+        """Get transaction flow data for a token
+        
+        Any pruning or ``cluster`` argument switches from the upstream
+        payload to the local graph engine over the token's raw transfers.
+        """
+        if top_k is None and min_weight is None and max_links is None and cluster is None:
+            # In a real implementation, this would use the token_address to filter data
+            # For now, we just pass a query ID to get dummy data
+            return self.dune_service.execute_query("transaction_flow", {"token_address": token_address})
+        
+        graph = self._get_transfer_graph(token_address)
+        if isinstance(graph, dict):
+            return graph
+        labels = self._get_cluster_labels(token_address, graph, cluster) if cluster else None
+        subgraph, node_index = graph.prune(top_k, min_weight, max_links)
+        return subgraph.to_flow_payload(None if labels is None else labels[node_index])
     
-    def get_ownership_data(self, token_address=None):
+    @instrumented
+    def get_anomaly_data(self, token_address=None, days=14, detector=None, window=7, threshold=3.0):
+        """Get anomaly detection data for a token
+        
+        With a ``detector`` from ``anomaly_engine.DETECTORS``, anomalies are
+        recomputed locally from the series instead of taken from the query.
+        """
+        if Config.SERIES_STORE_ENABLED:
+            data = self._get_stored_series("anomaly_detection", token_address, days, _anomaly_to_frame, _anomaly_from_frame)
+        else:
+            params = {"token_address": token_address, "days": days}
+            data = self.dune_service.execute_query("anomaly_detection", params)
+        
+        if detector is None or "error" in data:
+            return data
+        from services import anomaly_engine
+        anomalies = anomaly_engine.detect(data["dates"], data["values"], detector, window, threshold)
+        return {**data, "anomalies": anomalies}
+    
+    @instrumented
+    def scan_launchpad_anomalies(self, launchpad=None, days=30, detector="zscore", window=7, threshold=3.0, limit=50):
+        """
+        Score every token on a launchpad for anomalies in one batched pass
+        
+        One query returns the daily series of all tokens, which the local
+        engine scores together instead of running a query per token.
+        
+        Returns:
+            dict: Tokens ranked by their largest anomaly score
+        """
+        payload = self.dune_service.execute_query("launchpad_token_series", {"launchpad": launchpad, "days": days})
+        if isinstance(payload, dict) and "error" in payload:
+            return payload
+        rows = list(iter_dune_rows(payload))
+        if not rows:
+            return {"launchpad": launchpad, "dates": [], "scanned": 0, "tokens": []}
+        
+        from services import anomaly_engine
+        tokens, dates, matrix = anomaly_engine.pivot_rows(rows)
+        result = anomaly_engine.scan(matrix, detector, window, threshold)
+        max_scores = result["max_score"]
+        ranked = sorted(range(len(tokens)), key=lambda i: -1 if max_scores[i] != max_scores[i] else -max_scores[i])
+        return {
+            "launchpad": launchpad,
+            "dates": [dates[0], dates[-1]],
+            "scanned": len(tokens),
+            "tokens": [
+                {
+                    "token_address": tokens[i],
+                    "anomalyCount": int(result["anomaly_count"][i]),
+                    "maxScore": _round_or_none(max_scores[i]),
+                    "latestScore": _round_or_none(result["latest_score"][i]),
+                }
+                for i in ranked[:limit]
+            ],
+        }
+    
+    @instrumented
+    def get_ownership_data(self, token_address=None, top_n=10):
         """Get ownership concentration data for a token"""
+        if Config.HOLDER_INDEX_ENABLED:
+            return self.holder_indexes.read(token_address, lambda index: index.concentration(top_n))
         return self.dune_service.execute_query("ownership_concentration", {"token_address": token_address})
     
+    @instrumented
+    def get_holder_stats(self, token_address=None, top_n=10):
+        """Get top-N share, HHI and Gini of a token's holders from its holder index"""
+        if not Config.HOLDER_INDEX_ENABLED:
+            # There is no upstream query behind these stats
+            return {"error": "Holder stats need the holder index; set HOLDER_INDEX_ENABLED=1"}
+        return self.holder_indexes.read(token_address, lambda index: index.stats(top_n))
+    
+    @instrumented
     def get_sell_off_data(self, token_address=None, days=7):
         """Get sell-off pattern data for a token"""
+        if Config.HOLDER_INDEX_ENABLED:
+            dates = generate_date_range(days)
+            return self.holder_indexes.read(token_address, lambda index: index.whale_series(dates))
+        if Config.SERIES_STORE_ENABLED:
+            return self._get_stored_series("sell_off_patterns", token_address, days, _sell_off_to_frame, _sell_off_from_frame)
         params = {"token_address": token_address, "days": days}
         return self.dune_service.execute_query("sell_off_patterns", params)
     
+    @instrumented
     def get_volume_bracket_data(self, launchpad=None, days=30):
         """Get volume bracket distribution data"""
         params = {"launchpad": launchpad, "days": days}
         return self.dune_service.execute_query("volume_brackets", params)
     
+    @instrumented
     def get_bot_volume_data(self, token_address=None):
         """Get bot volume detection data for a token"""
         return self.dune_service.execute_query("bot_volume", {"token_address": token_address})
     
-    def get_post_rug_data(self, token_address=None):
+    @instrumented
+    def get_bot_volume_batch(self, token_addresses):
+        """Get bot volume detection data for many tokens, keyed by token address"""
+        return self.dune_service.execute_batch("bot_volume", token_addresses)
+    
+    @instrumented
+    def get_post_rug_data(self, token_address=None, days=7):
         """Get post-rug indicators data for a token"""
+        if Config.SERIES_STORE_ENABLED:
+            return self._get_stored_series("post_rug_indicators", token_address, days, _post_rug_to_frame, _post_rug_from_frame)
         return self.dune_service.execute_query("post_rug_indicators", {"token_address": token_address})
     
-    def get_wallet_clustering_data(self, token_address=None):
-        """Get wallet clustering data for a token"""
-        return self.dune_service.execute_query("wallet_clustering", {"token_address": token_address})
+    @instrumented
+    def get_post_rug_batch(self, token_addresses, days=7):
+        """Get post-rug indicators data for many tokens, keyed by token address
+        
+        With the series store on, each token is served from its stored series
+        as in ``get_post_rug_data``, on the report pool, since only the dates
+        missing for that token are fetched.
+        """
+        if not Config.SERIES_STORE_ENABLED:
+            return self.dune_service.execute_batch("post_rug_indicators", token_addresses)
+        tokens = list(dict.fromkeys(token_addresses))
+        futures = [
+            self._report_executor.submit(contextvars.copy_context().run, self.get_post_rug_data, token, days)
+            for token in tokens
+        ]
+        return {token: future.result() for token, future in zip(tokens, futures)}
     
+    @instrumented
+    def get_wallet_clustering_data(self, token_address=None, method=None, top_k=None, min_weight=None, max_links=None):
+        """Get wallet clustering data for a token
+        
+        With a clustering ``method`` or pruning argument, clusters are computed
+        locally over the token's raw transfers instead of upstream.
+        """
+        if method is None and top_k is None and min_weight is None and max_links is None:
+            return self.dune_service.execute_query("wallet_clustering", {"token_address": token_address})
+        
+        graph = self._get_transfer_graph(token_address)
+        if isinstance(graph, dict):
+            return graph
+        labels = self._get_cluster_labels(token_address, graph, method or "label_propagation")
+        subgraph, node_index = graph.prune(top_k, min_weight, max_links)
+        payload = subgraph.to_cluster_payload(labels[node_index])
+        payload["timeline"] = []
+        return payload
+    
+    def _get_transfer_graph(self, token_address):
+        """Build, or reuse, the transfer graph streamed from a token's raw transfers, or return the stream's error"""
+        params = {"token_address": token_address}
+        hit, graph = self.graph_cache.get("token_transfers", params)
+        if not hit:
+            from services.graph_engine import TransferGraph
+            errors = []
+            
+            def rows():
+                # A failed stream ends with a single error row instead of transfers
+                for row in self.dune_service.stream_query("token_transfers", params):
+                    if "error" in row:
+                        errors.append(row)
+                        return
+                    yield row
+            
+            graph = TransferGraph.from_rows(rows())
+            if errors:
+                return errors[0]
+            self.graph_cache.set("token_transfers", params, graph)
+        return graph
+    
+    def _get_cluster_labels(self, token_address, graph, method):
+        params = {"token_address": token_address, "method": method}
+        hit, labels = self.graph_cache.get("token_transfer_clusters", params)
+        if not hit:
+            from services.graph_engine import CLUSTER_METHODS
+            labels = CLUSTER_METHODS[method](graph)
+            self.graph_cache.set("token_transfer_clusters", params, labels)
+        return labels
+    
+    @instrumented
     def get_dashboard_summary(self):
         """Get dashboard summary data"""
-        return self.dune_service.execute_query("dashboard_summary")
\ No newline at end of file
+        if Config.DASHBOARD_AGGREGATES_ENABLED:
+            return self.dashboard_aggregates.summary()
+        return self.dune_service.execute_query("dashboard_summary")
+    
+    def _fetch_dashboard_activity(self, since, until, bucket_seconds):
+        """Fetch per-bucket activity counts between two epoch times, oldest first"""
+        params = {"since": format_timestamp(since), "until": format_timestamp(until), "bucket_seconds": bucket_seconds}
+        payload = self.dune_service.execute_query("dashboard_activity", params)
+        if isinstance(payload, dict) and "error" in payload:
+            return payload
+        return list(iter_dune_rows(payload))
+    
+    def _fetch_holder_transfers(self, token_address, since_seq=None):
+        """Fetch holder transfer deltas after ``since_seq``, oldest first"""
+        # Deltas change as transfers land; a cached empty delta would stall the index
+        payload = self.dune_service.execute_query_uncached(
+            "holder_transfers", {"token_address": token_address, "since_seq": since_seq})
+        if isinstance(payload, dict) and "error" in payload:
+            return payload
+        return list(iter_dune_rows(payload))
+    
+    def _get_stored_series(self, query_id, token_address, days, to_frame, from_frame):
+        """Serve a per-date series from the local store, fetching only missing dates from Dune"""
+        errors = []
+        
+        def fetch(start_date, end_date):
+            params = {"token_address": token_address, "start_date": start_date, "end_date": end_date}
+            payload = self.dune_service.execute_query(query_id, params)
+            if isinstance(payload, dict) and "error" in payload:
+                errors.append(payload)
+                return None
+            return to_frame(payload)
+        
+        frame = self.series_store.get_series(query_id, token_address, days, fetch)
+        if errors and not frame["dates"]:
+            return errors[0]
+        return from_frame(frame)
+    
+    def batch_method(self, section):
+        """Return the bound DataService method behind a section in BATCH_SECTIONS"""
+        return getattr(self, BATCH_SECTIONS[section])
+    
+    def section_method(self, section):
+        """Return the bound DataService method behind a section in SECTION_METHODS"""
+        return getattr(self, SECTION_METHODS[section])
+    
+    def run_section(self, section, params=None):
+        """Run a section with keyword parameters, as a background job does"""
+        return self.section_method(section)(**(params or {}))
+    
+    def stream_section_rows(self, section, token_address=None, days=None, launchpad=None, page_size=None):
+        """Yield the raw result rows behind a report section without buffering them"""
+        query_id, params = self.section_query(section, token_address, days, launchpad)
+        return self.dune_service.stream_query(query_id, params, page_size)
+    
+    def section_query(self, section, token_address=None, days=None, launchpad=None):
+        """Return the ``(query_id, params)`` behind a report section"""
+        params = {"token_address": token_address, "days": days, "launchpad": launchpad}
+        params = {k: v for k, v in params.items() if v is not None}
+        return SECTION_QUERIES[section], params or None
+    
+    @instrumented
+    def get_token_report(self, token_address=None, sections=None, launchpad=None):
+        """
+        Run several sections for a token concurrently and combine the results
+        
+        Args:
+            token_address (str): Token to report on
+            sections (list): Section names from REPORT_SECTIONS, all if None
+            launchpad (str): Launchpad filter for the volume-brackets section
+            
+        Returns:
+            dict: Section payloads plus per-section timings in ms and errors
+        """
+        sections = list(sections or REPORT_SECTIONS)
+        loaders = {
+            "transaction-flow": lambda: self.get_transaction_flow_data(token_address),
+            "anomaly-detection": lambda: self.get_anomaly_data(token_address),
+            "ownership-concentration": lambda: self.get_ownership_data(token_address),
+            "sell-off-patterns": lambda: self.get_sell_off_data(token_address),
+            "volume-brackets": lambda: self.get_volume_bracket_data(launchpad),
+            "bot-volume": lambda: self.get_bot_volume_data(token_address),
+            "post-rug-indicators": lambda: self.get_post_rug_data(token_address),
+            "wallet-clustering": lambda: self.get_wallet_clustering_data(token_address),
+            "dashboard-summary": self.get_dashboard_summary,
+        }
+        
+        def run(name):
+            started = time.perf_counter()
+            try:
+                data, error = loaders[name](), None
+            except Exception as e:
+                data, error = None, str(e)
+            if isinstance(data, dict) and "error" in data:
+                data, error = None, data["error"]
+            return data, error, (time.perf_counter() - started) * 1000
+        
+        started = time.perf_counter()
+        # Each section runs in a copy of this context so its timings land on the request
+        futures = {
+            name: self._report_executor.submit(contextvars.copy_context().run, run, name)
+            for name in sections
+        }
+        
+        report = {"token_address": token_address, "sections": {}, "timings": {}, "errors": {}}
+        for name, future in futures.items():
+            data, error, elapsed_ms = future.result()
+            report["timings"][name] = round(elapsed_ms, 2)
+            if error is not None:
+                report["errors"][name] = error
+            else:
+                report["sections"][name] = data
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+
+def _round_or_none(value):
+    return None if value != value else round(float(value), 2)
+
+def _series_frame(series, meta=None):
+    """Build a store frame from ``{column: (dates, values)}``, aligning dates"""
+    dates = sorted({day for column_dates, _ in series.values() for day in column_dates})
+    columns = {}
+    for column, (column_dates, values) in series.items():
+        by_date = dict(zip(column_dates, values))
+        columns[column] = [by_date.get(day) for day in dates]
+    return {"dates": dates, "columns": columns, "meta": meta or {}}
+
+def _anomaly_to_frame(payload):
+    # Upstream anomalies are kept as a signed percentage column: spikes positive, drops negative
+    pct = {
+        a["date"]: a["percentage"] if a.get("type", "spike") == "spike" else -a["percentage"]
+        for a in payload.get("anomalies", [])
+    }
+    dates = payload.get("dates", [])
+    return _series_frame({
+        "value": (dates, payload.get("values", [])),
+        "anomaly_pct": (list(pct), list(pct.values())),
+    })
+
+def _anomaly_from_frame(frame):
+    values = frame["columns"].get("value", [None] * len(frame["dates"]))
+    pcts = frame["columns"].get("anomaly_pct", [None] * len(frame["dates"]))
+    return {
+        "dates": frame["dates"],
+        "values": values,
+        "anomalies": [
+            {"date": day, "value": value, "type": "spike" if pct >= 0 else "drop", "percentage": abs(pct)}
+            for day, value, pct in zip(frame["dates"], values, pcts)
+            if pct is not None
+        ],
+    }
+
+def _sell_off_to_frame(payload):
+    dates = payload.get("dates", [])
+    return _series_frame(
+        {wallet["id"]: (dates, wallet["balances"]) for wallet in payload.get("wallets", [])},
+        meta={"labels": {wallet["id"]: wallet.get("label") for wallet in payload.get("wallets", [])}},
+    )
+
+def _sell_off_from_frame(frame):
+    labels = frame["meta"].get("labels", {})
+    return {
+        "dates": frame["dates"],
+        "wallets": [
+            {"id": wallet_id, "label": labels.get(wallet_id), "balances": balances}
+            for wallet_id, balances in frame["columns"].items()
+        ],
+    }
+
+def _post_rug_to_frame(payload):
+    price_data = payload.get("priceData", {})
+    activity_data = payload.get("activityData", {})
+    return _series_frame(
+        {
+            "price": (price_data.get("dates", []), price_data.get("prices", [])),
+            "transactions": (activity_data.get("dates", []), activity_data.get("transactions", [])),
+        },
+        meta={"lpPull": payload.get("lpPull"), "rugEvent": price_data.get("rugEvent") or activity_data.get("rugEvent")},
+    )
+
+def _post_rug_from_frame(frame):
+    dates = frame["dates"]
+    rug_event = frame["meta"].get("rugEvent")
+    return {
+        "lpPull": frame["meta"].get("lpPull"),
+        "priceData": {"dates": dates, "prices": frame["columns"].get("price", []), "rugEvent": rug_event},
+        "activityData": {"dates": dates, "transactions": frame["columns"].get("transactions", []), "rugEvent": rug_event},
+    }
@@ -0,0 +1,318 @@
+"""Sample Dune payloads served in demo mode (DUNE_USE_API unset).
+
+Kept out of dune_service so API-mode workers never import them.
+"""
+import random
+from utils.helpers import format_timestamp, generate_date_range, parse_timestamp
+
+
+def get_result(query_id, params=None):
+    """Return dummy data based on query_id"""
+    if query_id == "transaction_flow":
+        return _transaction_flow()
+    elif query_id == "anomaly_detection":
+        return _anomaly_data()
+    elif query_id == "ownership_concentration":
+        return _ownership_data()
+    elif query_id == "sell_off_patterns":
+        return _sell_off_data()
+    elif query_id == "volume_brackets":
+        return _volume_bracket_data()
+    elif query_id == "bot_volume":
+        return _bot_volume_data()
+    elif query_id == "post_rug_indicators":
+        return _post_rug_data()
+    elif query_id == "wallet_clustering":
+        return _wallet_clustering_data()
+    elif query_id == "dashboard_summary":
+        return _dashboard_summary()
+    elif query_id == "dashboard_activity":
+        return _dashboard_activity(params)
+    elif query_id == "holder_transfers":
+        return _holder_transfers(params)
+    elif query_id == "token_transfers":
+        return _token_transfers()
+    elif query_id == "launchpad_token_series":
+        return _launchpad_token_series(params)
+    else:
+        return {"error": "Query not found"}
+
+
+def _transaction_flow():
+    """Return dummy transaction flow data"""
+    return {
+        "nodes": [
+            {"id": "wallet1", "label": "Wallet 1", "size": 20, "color": "#82e0aa"},
+            {"id": "wallet2", "label": "Wallet 2", "size": 15, "color": "#82e0aa"},
+            {"id": "wallet3", "label": "Wallet 3", "size": 25, "color": "#f5cba7"},
+            {"id": "wallet4", "label": "Wallet 4", "size": 10, "color": "#82e0aa"},
+            {"id": "wallet5", "label": "Wallet 5", "size": 18, "color": "#f5cba7"},
+            {"id": "wallet6", "label": "Wallet 6", "size": 12, "color": "#82e0aa"},
+            {"id": "wallet7", "label": "Wallet 7", "size": 22, "color": "#f5cba7"},
+            {"id": "exchange1", "label": "Exchange 1", "size": 30, "color": "#aed6f1"},
+            {"id": "exchange2", "label": "Exchange 2", "size": 28, "color": "#aed6f1"},
+        ],
+        "links": [
+            {"source": "wallet1", "target": "wallet3", "value": 5},
+            {"source": "wallet1", "target": "wallet2", "value": 3},
+            {"source": "wallet2", "target": "wallet4", "value": 2},
+            {"source": "wallet3", "target": "wallet5", "value": 7},
+            {"source": "wallet3", "target": "exchange1", "value": 10},
+            {"source": "wallet4", "target": "wallet6", "value": 1},
+            {"source": "wallet5", "target": "exchange2", "value": 8},
+            {"source": "wallet6", "target": "wallet7", "value": 4},
+            {"source": "wallet7", "target": "exchange2", "value": 6},
+        ]
+    }
+
+
+def _anomaly_data():
+    """Return dummy anomaly detection data"""
+    return {
+        "dates": [
+            '2023-04-01', '2023-04-02', '2023-04-03', '2023-04-04', 
+            '2023-04-05', '2023-04-06', '2023-04-07', '2023-04-08',
+            '2023-04-09', '2023-04-10', '2023-04-11', '2023-04-12',
+            '2023-04-13', '2023-04-14'
+        ],
+        "values": [
+            120, 125, 130, 220, 190, 185, 250, 280, 275, 190, 350, 320, 310, 290
+        ],
+        "anomalies": [
+            {"date": '2023-04-04', "value": 220, "type": 'spike', "percentage": 69.2},
+            {"date": '2023-04-11', "value": 350, "type": 'spike', "percentage": 84.2},
+        ]
+    }
+
+
+def _ownership_data():
+    """Return dummy ownership concentration data"""
+    return [
+        {"id": "wallet1", "label": "Whale 1", "value": 25.3},
+        {"id": "wallet2", "label": "Whale 2", "value": 18.7},
+        {"id": "wallet3", "label": "Whale 3", "value": 12.4},
+        {"id": "wallet4", "label": "Whale 4", "value": 8.9},
+        {"id": "wallet5", "label": "Whale 5", "value": 6.2},
+        {"id": "wallet6", "label": "Whale 6", "value": 4.8},
+        {"id": "wallet7", "label": "Whale 7", "value": 3.5},
+        {"id": "wallet8", "label": "Whale 8", "value": 2.9},
+        {"id": "wallet9", "label": "Whale 9", "value": 2.1},
+        {"id": "wallet10", "label": "Whale 10", "value": 1.8},
+        {"id": "others", "label": "Others", "value": 13.4}
+    ]
+
+
+def _sell_off_data():
+    """Return dummy sell-off pattern data"""
+    return {
+        "dates": [
+            '2023-04-01', '2023-04-02', '2023-04-03', '2023-04-04', 
+            '2023-04-05', '2023-04-06', '2023-04-07'
+        ],
+        "wallets": [
+            {
+                "id": "wallet1",
+                "label": "Whale 1",
+                "balances": [1000000, 1000000, 950000, 800000, 500000, 200000, 0]
+            },
+            {
+                "id": "wallet2",
+                "label": "Whale 2",
+                "balances": [800000, 800000, 800000, 750000, 600000, 300000, 100000]
+            },
+            {
+                "id": "wallet3",
+                "label": "Whale 3",
+                "balances": [600000, 600000, 600000, 600000, 550000, 400000, 200000]
+            },
+            {
+                "id": "wallet4",
+                "label": "Whale 4",
+                "balances": [400000, 400000, 400000, 400000, 400000, 350000, 300000]
+            }
+        ]
+    }
+
+
+def _volume_bracket_data():
+    """Return dummy volume bracket data"""
+    return [
+        {"bracket": "$0-$100", "count": 1245},
+        {"bracket": "$100-$500", "count": 842},
+        {"bracket": "$500-$1K", "count": 433},
+        {"bracket": "$1K-$5K", "count": 287},
+        {"bracket": "$5K-$10K", "count": 126},
+        {"bracket": "$10K-$50K", "count": 64},
+        {"bracket": "$50K-$100K", "count": 28},
+        {"bracket": "$100K+", "count": 12}
+    ]
+
+
+def _bot_volume_data():
+    """Return dummy bot volume data"""
+    return [
+        {"type": "Bot Transactions", "value": 42.7},
+        {"type": "Organic Transactions", "value": 57.3}
+    ]
+
+
+def _post_rug_data():
+    """Return dummy post-rug indicators data"""
+    return {
+        "lpPull": 87.5,  # percentage of LP pulled
+        "priceData": {
+            "dates": [
+                '2023-04-01', '2023-04-02', '2023-04-03', '2023-04-04', 
+                '2023-04-05', '2023-04-06', '2023-04-07'
+            ],
+            "prices": [0.00012, 0.00011, 0.00010, 0.000095, 0.000025, 0.0000032, 0.0000008],
+            "rugEvent": '2023-04-05'  # date of the rug pull
+        },
+        "activityData": {
+            "dates": [
+                '2023-04-01', '2023-04-02', '2023-04-03', '2023-04-04', 
+                '2023-04-05', '2023-04-06', '2023-04-07'
+            ],
+            "transactions": [1245, 1322, 1187, 1402, 1523, 245, 32],
+            "rugEvent": '2023-04-05'  # date of the rug pull
+        }
+    }
+
+
+def _wallet_clustering_data():
+    """Return dummy wallet clustering data"""
+    return {
+        "nodes": [
+            {"id": "cluster1", "label": "Cluster 1", "size": 25, "color": "#82e0aa", "type": "cluster"},
+            {"id": "cluster2", "label": "Cluster 2", "size": 20, "color": "#f5cba7", "type": "cluster"},
+            {"id": "cluster3", "label": "Cluster 3", "size": 15, "color": "#aed6f1", "type": "cluster"},
+            {"id": "wallet1", "label": "Wallet 1", "size": 10, "color": "#82e0aa", "type": "wallet", "cluster": "cluster1"},
+            {"id": "wallet2", "label": "Wallet 2", "size": 10, "color": "#82e0aa", "type": "wallet", "cluster": "cluster1"},
+            {"id": "wallet3", "label": "Wallet 3", "size": 10, "color": "#82e0aa", "type": "wallet", "cluster": "cluster1"},
+            {"id": "wallet4", "label": "Wallet 4", "size": 10, "color": "#f5cba7", "type": "wallet", "cluster": "cluster2"},
+            {"id": "wallet5", "label": "Wallet 5", "size": 10, "color": "#f5cba7", "type": "wallet", "cluster": "cluster2"},
+            {"id": "wallet6", "label": "Wallet 6", "size": 10, "color": "#aed6f1", "type": "wallet", "cluster": "cluster3"},
+            {"id": "wallet7", "label": "Wallet 7", "size": 10, "color": "#aed6f1", "type": "wallet", "cluster": "cluster3"},
+        ],
+        "links": [
+            {"source": "wallet1", "target": "cluster1", "value": 1},
+            {"source": "wallet2", "target": "cluster1", "value": 1},
+            {"source": "wallet3", "target": "cluster1", "value": 1},
+            {"source": "wallet4", "target": "cluster2", "value": 1},
+            {"source": "wallet5", "target": "cluster2", "value": 1},
+            {"source": "wallet6", "target": "cluster3", "value": 1},
+            {"source": "wallet7", "target": "cluster3", "value": 1},
+            {"source": "wallet1", "target": "wallet2", "value": 3},
+            {"source": "wallet2", "target": "wallet3", "value": 2},
+            {"source": "wallet4", "target": "wallet5", "value": 4},
+            {"source": "wallet6", "target": "wallet7", "value": 1},
+            {"source": "cluster1", "target": "cluster2", "value": 5},
+            {"source": "cluster2", "target": "cluster3", "value": 3},
+        ],
+        "timeline": [
+            {"time": "2023-04-01 08:23", "wallet": "wallet1", "action": "buy", "amount": 50000},
+            {"time": "2023-04-01 09:45", "wallet": "wallet2", "action": "buy", "amount": 75000},
+            {"time": "2023-04-01 12:12", "wallet": "wallet4", "action": "buy", "amount": 120000},
+            {"time": "2023-04-02 14:30", "wallet": "wallet1", "action": "transfer", "target": "wallet3", "amount": 25000},
+            {"time": "2023-04-02 15:22", "wallet": "wallet4", "action": "transfer", "target": "wallet5", "amount": 60000},
+            {"time": "2023-04-03 10:15", "wallet": "wallet6", "action": "buy", "amount": 90000},
+            {"time": "2023-04-03 11:45", "wallet": "wallet7", "action": "buy", "amount": 45000},
+            {"time": "2023-04-04 09:30", "wallet": "wallet3", "action": "sell", "amount": 15000},
+            {"time": "2023-04-04 16:20", "wallet": "wallet5", "action": "sell", "amount": 30000},
+        ]
+    }
+
+
+def _dashboard_summary():
+    """Return dummy dashboard summary data"""
+    return {
+        "totalTransactions": 1234,
+        "transactionsChange": 12.5,
+        "activeWallets": 567,
+        "walletsChange": 8.3,
+        "suspiciousActivity": 89,
+        "suspiciousChange": -5.2,
+        "botPercentage": 42.7,
+        "whaleConcentration": 84.7,
+        "anomalyCount": 5
+    }
+
+
+def _dashboard_activity(params=None):
+    """Return dummy per-bucket activity counts between ``since`` and ``until``"""
+    params = params or {}
+    bucket_seconds = params.get("bucket_seconds") or 3600
+    first = int(parse_timestamp(params["since"]) // bucket_seconds)
+    # Every bucket starting before ``until``, including a partial last one
+    end = int(-(-parse_timestamp(params["until"]) // bucket_seconds))
+    rows = []
+    for bucket in range(first, end):
+        # Seeded per bucket, so refetching a bucket returns the same counts
+        rng = random.Random(bucket)
+        transactions = rng.randint(30, 70)
+        rows.append({
+            "bucket_start": format_timestamp(bucket * bucket_seconds),
+            "transactions": transactions,
+            "bot_transactions": round(transactions * rng.uniform(0.35, 0.5)),
+            "suspicious": rng.randint(1, 6),
+            "anomalies": 1 if rng.random() < 0.1 else 0,
+            "active_wallets": rng.randint(520, 620),
+            "whale_concentration": round(rng.uniform(80, 88), 1),
+        })
+    return rows
+
+
+def _holder_transfers(params=None):
+    """Return dummy transfer deltas: an initial distribution matching the
+    ownership data, then the whale sell-offs from the sell-off data"""
+    if (params or {}).get("since_seq") is not None:
+        return []
+    
+    supply = 1_000_000_000
+    dates = generate_date_range(6)
+    mint_time = f"{generate_date_range(30)[0]} 00:00:00"
+    rows = []
+    for holder in _ownership_data():
+        if holder["id"] == "others":
+            # Spread the remainder over many small holders
+            for i in range(50):
+                rows.append({"from": None, "to": f"holder{i + 1}", "amount": supply * holder["value"] / 100 / 50, "block_time": mint_time})
+        else:
+            rows.append({"from": None, "to": holder["id"], "amount": supply * holder["value"] / 100, "block_time": mint_time})
+    
+    initial = {row["to"]: row["amount"] for row in rows}
+    for wallet in _sell_off_data()["wallets"]:
+        start = wallet["balances"][0]
+        for day, previous, current in zip(dates[1:], wallet["balances"], wallet["balances"][1:]):
+            if current < previous:
+                amount = initial[wallet["id"]] * (previous - current) / start
+                rows.append({"from": wallet["id"], "to": "exchange1", "amount": amount, "block_time": f"{day} 12:00:00"})
+    
+    for seq, row in enumerate(rows):
+        row["seq"] = seq
+    return rows
+
+
+def _token_transfers():
+    """Return dummy raw transfer rows matching the transaction flow links"""
+    return [
+        {"from": link["source"], "to": link["target"], "amount": link["value"]}
+        for link in _transaction_flow()["links"]
+    ]
+
+
+def _launchpad_token_series(params=None):
+    """Return dummy daily volume rows for every token on a launchpad"""
+    params = params or {}
+    rng = random.Random(str(params.get("launchpad")))
+    dates = generate_date_range(params.get("days") or 30)
+    rows = []
+    for i in range(200):
+        token_address = f"token{i + 1}"
+        volume = rng.uniform(1000, 50000)
+        for day in dates:
+            volume = max(0.0, volume * rng.uniform(0.9, 1.1))
+            # Roughly one token-day in fifty gets a pump or a dump
+            shock = rng.choice((4.0, 0.2)) if rng.random() < 0.02 else 1.0
+            rows.append({"token_address": token_address, "date": day, "value": round(volume * shock, 2)})
+    return rows
@@ -0,0 +1,287 @@
+import numpy as np
+
+# Cluster colors, starting with the palette used by the upstream payloads
+CLUSTER_COLORS = (
+    "#82e0aa", "#f5cba7", "#aed6f1", "#d7bde2", "#f9e79f",
+    "#f1948a", "#a3e4d7", "#d5dbdb", "#fad7a0", "#abebc6",
+)
+
+
+class TransferGraph:
+    """Weighted transfer graph over integer-indexed wallets.
+
+    Wallet IDs are mapped to ``0..n-1`` once; edges are parallel ``src``,
+    ``dst`` and ``weight`` arrays. Clustering and pruning work on a
+    symmetric CSR adjacency built lazily from them, so memory stays at a
+    few arrays of length ``2 * edges`` however large the graph.
+    """
+
+    def __init__(self, ids, src, dst, weight):
+        self.ids = list(ids)
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self._csr = None
+
+    @classmethod
+    def from_rows(cls, rows, source="from", target="to", value="amount"):
+        """
+        Build a graph from transfer rows, e.g. streamed from Dune
+
+        Mints and burns, whose ``from`` or ``to`` is empty, link no two
+        wallets and are skipped.
+        """
+        index = {}
+        src, dst, weight = [], [], []
+        for row in rows:
+            if not row.get(source) or not row.get(target):
+                continue
+            src.append(index.setdefault(row[source], len(index)))
+            dst.append(index.setdefault(row[target], len(index)))
+            weight.append(row[value])
+        return cls(index, src, dst, weight)
+
+    @classmethod
+    def from_links(cls, nodes, links):
+        """Build a graph from an upstream ``nodes``/``links`` payload"""
+        index = {node["id"]: i for i, node in enumerate(nodes)}
+        for link in links:
+            for end in (link["source"], link["target"]):
+                index.setdefault(end, len(index))
+        return cls(
+            index,
+            [index[link["source"]] for link in links],
+            [index[link["target"]] for link in links],
+            [link.get("value", 1) for link in links],
+        )
+
+    @property
+    def node_count(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    def csr(self):
+        """
+        Return the symmetric adjacency as CSR arrays
+
+        Returns:
+            tuple: ``(indptr, indices, weights)`` where the neighbours of node
+            ``i`` are ``indices[indptr[i]:indptr[i + 1]]``
+        """
+        if self._csr is None:
+            rows = np.concatenate([self.src, self.dst])
+            cols = np.concatenate([self.dst, self.src])
+            weights = np.concatenate([self.weight, self.weight])
+            order = np.argsort(rows)
+            indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=self.node_count), out=indptr[1:])
+            self._csr = indptr, cols[order], weights[order]
+        return self._csr
+
+    def strength(self):
+        """Total transfer value touching each node"""
+        strength = np.bincount(self.src, weights=self.weight, minlength=self.node_count)
+        strength += np.bincount(self.dst, weights=self.weight, minlength=self.node_count)
+        return strength
+
+    def connected_components(self):
+        """
+        Label nodes by connected component using array-based union-find
+
+        Each round hooks the larger root of every edge onto the smaller one,
+        then compresses paths by pointer jumping until every node points at
+        its root. Rounds are whole-array operations, and the number of rounds
+        grows with the log of the component diameter rather than the edge count.
+
+        Returns:
+            ndarray: Component label per node, the smallest node index in it
+        """
+        parent = np.arange(self.node_count, dtype=np.int64)
+        src, dst = self.src, self.dst
+        while True:
+            root_src, root_dst = parent[src], parent[dst]
+            pending = root_src != root_dst
+            if not pending.any():
+                return parent
+            src, dst = src[pending], dst[pending]
+            low = np.minimum(root_src[pending], root_dst[pending])
+            high = np.maximum(root_src[pending], root_dst[pending])
+            parent[high] = low
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+
+    def label_propagation(self, max_iter=10, seed=0):
+        """
+        Cluster nodes by weighted label propagation
+
+        Each node adopts the label carrying the most transfer value among its
+        neighbours. A random half of the nodes updates per round, which avoids
+        the oscillation of fully synchronous updates. Each round is one sort
+        of the neighbour entries plus linear passes over them.
+
+        Returns:
+            ndarray: Cluster label per node
+        """
+        n = self.node_count
+        if self.edge_count == 0:
+            return np.arange(n, dtype=np.int64)
+        indptr, indices, weights = self.csr()
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        labels = np.arange(n, dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        # Stop once almost no node would change; exact stability can take many rounds
+        tolerance = n // 1000
+
+        for _ in range(max_iter):
+            # Sort neighbour entries by (node, neighbour label) and sum each run
+            keys = rows * n + labels[indices]
+            order = np.argsort(keys)
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            totals = np.add.reduceat(weights[order], starts)
+            nodes, candidates = keys[starts] // n, keys[starts] % n
+
+            # Keep the heaviest label per node; ties go to the smallest label
+            node_starts = np.flatnonzero(np.r_[True, nodes[1:] != nodes[:-1]])
+            heaviest = np.maximum.reduceat(totals, node_starts)
+            is_best = totals == np.repeat(heaviest, np.diff(np.r_[node_starts, len(nodes)]))
+            best_runs = np.flatnonzero(is_best)
+            first = best_runs[np.r_[True, nodes[best_runs][1:] != nodes[best_runs][:-1]]]
+            best = labels.copy()
+            best[nodes[first]] = candidates[first]
+
+            changed = best != labels
+            if changed.sum() <= tolerance:
+                break
+            update = changed & (rng.random(n) < 0.5)
+            labels[update] = best[update]
+        return labels
+
+    def prune(self, top_k=None, min_weight=None, max_links=None):
+        """
+        Return a renderable subgraph
+
+        Args:
+            top_k (int): Keep only the k nodes with the most transfer value
+            min_weight (float): Drop edges lighter than this
+            max_links (int): Keep only the heaviest remaining edges
+
+        Returns:
+            tuple: ``(subgraph, node_index)`` where ``node_index`` maps the
+            subgraph's nodes back to this graph's node indices
+        """
+        keep_edge = np.ones(self.edge_count, dtype=bool)
+        if min_weight is not None:
+            keep_edge &= self.weight >= min_weight
+
+        if top_k is not None and top_k < self.node_count:
+            strength = self.strength()
+            keep_node = np.zeros(self.node_count, dtype=bool)
+            keep_node[np.argpartition(-strength, top_k - 1)[:top_k]] = True
+            keep_edge &= keep_node[self.src] & keep_node[self.dst]
+        else:
+            keep_node = None
+
+        edges = np.flatnonzero(keep_edge)
+        if max_links is not None and len(edges) > max_links:
+            heaviest = np.argpartition(-self.weight[edges], max_links - 1)[:max_links]
+            edges = np.sort(edges[heaviest])
+
+        used = np.unique(np.concatenate([self.src[edges], self.dst[edges]]))
+        if keep_node is not None:
+            used = np.union1d(used, np.flatnonzero(keep_node))
+        remap = np.full(self.node_count, -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        subgraph = TransferGraph(
+            [self.ids[i] for i in used],
+            remap[self.src[edges]],
+            remap[self.dst[edges]],
+            self.weight[edges],
+        )
+        return subgraph, used
+
+    def to_flow_payload(self, labels=None):
+        """Render as the transaction-flow ``nodes``/``links`` payload"""
+        strength = self.strength()
+        sizes = _node_sizes(strength)
+        if labels is not None:
+            _, clusters = np.unique(labels, return_inverse=True)
+        nodes = []
+        for i, node_id in enumerate(self.ids):
+            node = {"id": node_id, "label": str(node_id), "size": sizes[i], "value": float(strength[i])}
+            if labels is not None:
+                node["cluster"] = f"cluster{clusters[i] + 1}"
+                node["color"] = CLUSTER_COLORS[clusters[i] % len(CLUSTER_COLORS)]
+            else:
+                node["color"] = CLUSTER_COLORS[0]
+            nodes.append(node)
+        links = [
+            {"source": self.ids[s], "target": self.ids[d], "value": w}
+            for s, d, w in zip(self.src.tolist(), self.dst.tolist(), self.weight.tolist())
+        ]
+        return {"nodes": nodes, "links": links}
+
+    def to_cluster_payload(self, labels):
+        """Render as the wallet-clustering payload: cluster nodes, wallet
+        nodes, membership links and aggregated links between clusters"""
+        _, clusters = np.unique(labels, return_inverse=True)
+        members = np.bincount(clusters)
+        color = [CLUSTER_COLORS[c % len(CLUSTER_COLORS)] for c in range(len(members))]
+        cluster_sizes = _node_sizes(members.astype(np.float64))
+
+        nodes = [
+            {"id": f"cluster{c + 1}", "label": f"Cluster {c + 1}", "size": cluster_sizes[c],
+             "color": color[c], "type": "cluster", "members": int(members[c])}
+            for c in range(len(members))
+        ]
+        nodes += [
+            {"id": node_id, "label": str(node_id), "size": 10, "color": color[clusters[i]],
+             "type": "wallet", "cluster": f"cluster{clusters[i] + 1}"}
+            for i, node_id in enumerate(self.ids)
+        ]
+
+        links = [
+            {"source": node_id, "target": f"cluster{clusters[i] + 1}", "value": 1}
+            for i, node_id in enumerate(self.ids)
+        ]
+        links += [
+            {"source": self.ids[s], "target": self.ids[d], "value": w}
+            for s, d, w in zip(self.src.tolist(), self.dst.tolist(), self.weight.tolist())
+        ]
+
+        # Sum transfer value between each pair of distinct clusters
+        a, b = clusters[self.src], clusters[self.dst]
+        between = a != b
+        low, high = np.minimum(a, b)[between], np.maximum(a, b)[between]
+        pairs, inverse = np.unique(low * len(members) + high, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.weight[between])
+        links += [
+            {"source": f"cluster{p // len(members) + 1}", "target": f"cluster{p % len(members) + 1}",
+             "value": float(total)}
+            for p, total in zip(pairs.tolist(), totals.tolist())
+        ]
+        return {"nodes": nodes, "links": links}
+
+
+# Clustering methods selectable from the API
+CLUSTER_METHODS = {
+    "components": TransferGraph.connected_components,
+    "label_propagation": TransferGraph.label_propagation,
+}
+
+
+def _node_sizes(values, smallest=10, largest=30):
+    # Scale node sizes into the range the frontend uses, on a log scale
+    if len(values) == 0:
+        return []
+    scaled = np.log1p(np.maximum(values, 0))
+    span = scaled.max() - scaled.min()
+    if span == 0:
+        return [smallest] * len(values)
+    return np.rint(smallest + (scaled - scaled.min()) / span * (largest - smallest)).astype(int).tolist()
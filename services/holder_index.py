@@ -0,0 +1,261 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+# Per-token locks are striped so the registry holds a fixed number of them
+LOCK_STRIPES = 64
+
+
+class HolderIndex:
+    """Incrementally maintained holder balances for one token.
+
+    Balances live in a dict plus a list of ``(-balance, address)`` kept
+    sorted with ``bisect``, so the top N holders are the first N entries.
+    Total supply and the sum of squared balances are updated with every
+    transfer, which makes top-N shares and HHI O(N) and O(1) per request.
+    Gini needs every balance and is recomputed only after the balances
+    change.
+
+    Wallets that ever rank in the top ``tracked`` holders get a per-day
+    balance history, which backs the whale sell-off series.
+    """
+
+    def __init__(self, token_address, tracked=None):
+        self.token_address = token_address
+        self.tracked = tracked or Config.HOLDER_INDEX_TRACKED
+        self.balances = {}
+        self.cursor = None
+        self.synced_at = 0.0
+        self.history = {}
+
+        self._sorted = []
+        self._total = 0.0
+        self._sum_sq = 0.0
+        self._gini = None
+
+    def apply_transfers(self, transfers):
+        """
+        Apply transfer deltas in order
+
+        Args:
+            transfers (iterable): Rows with ``from``, ``to``, ``amount``,
+                ``block_time`` (ISO timestamp) and a monotonically increasing
+                ``seq``. An empty ``from`` is a mint and an empty ``to`` a burn.
+        """
+        for transfer in transfers:
+            day = str(transfer["block_time"])[:10]
+            amount = float(transfer["amount"])
+            if transfer.get("from"):
+                self._adjust(transfer["from"], -amount, day)
+            if transfer.get("to"):
+                self._adjust(transfer["to"], amount, day)
+            self.cursor = transfer["seq"]
+
+    def top(self, n):
+        """Return the ``n`` largest holders as ``(address, balance)`` pairs"""
+        return [(address, -negative) for negative, address in self._sorted[:n]]
+
+    def concentration(self, n=10):
+        """Return the top-N holders' shares of supply and the remainder, in percent"""
+        if self._total <= 0:
+            return []
+        top = self.top(n)
+        shares = [
+            {"id": address, "label": f"Whale {i + 1}", "value": round(balance / self._total * 100, 1)}
+            for i, (address, balance) in enumerate(top)
+        ]
+        others = self._total - sum(balance for _, balance in top)
+        shares.append({"id": "others", "label": "Others", "value": round(others / self._total * 100, 1)})
+        return shares
+
+    def hhi(self):
+        """Herfindahl-Hirschman index of holder shares, from 0 to 10000"""
+        if self._total <= 0:
+            return 0.0
+        return self._sum_sq / (self._total * self._total) * 10000
+
+    def gini(self):
+        """Gini coefficient of holder balances, cached until the next transfer"""
+        if self._gini is None:
+            n = len(self._sorted)
+            if n == 0 or self._total <= 0:
+                self._gini = 0.0
+            else:
+                # _sorted is descending, so rank i from the top is rank n - i ascending
+                weighted = sum((n - i) * -negative for i, (negative, _) in enumerate(self._sorted))
+                self._gini = 2 * weighted / (n * self._total) - (n + 1) / n
+        return self._gini
+
+    def stats(self, n=10):
+        top_share = sum(balance for _, balance in self.top(n)) / self._total * 100 if self._total > 0 else 0.0
+        return {
+            "holders": len(self._sorted),
+            "topN": n,
+            "topNShare": round(top_share, 2),
+            "hhi": round(self.hhi(), 2),
+            "gini": round(self.gini(), 4),
+        }
+
+    def whale_series(self, dates, n=4):
+        """
+        Return daily balances of the ``n`` tracked wallets with the largest
+        peak balance over ``dates``, so whales that sold out still show up
+
+        Days before a wallet's history starts are None.
+        """
+        series = {}
+        for address, points in self.history.items():
+            days = [day for day, _ in points]
+            balances = []
+            for day in dates:
+                j = bisect.bisect_right(days, day) - 1
+                balances.append(points[j][1] if j >= 0 else None)
+            series[address] = balances
+
+        def peak(address):
+            return max((b for b in series[address] if b is not None), default=0.0)
+
+        whales = sorted(series, key=peak, reverse=True)[:n]
+        return {
+            "dates": list(dates),
+            "wallets": [
+                {"id": address, "label": f"Whale {i + 1}", "balances": series[address]}
+                for i, address in enumerate(whales)
+            ],
+        }
+
+    def to_dict(self):
+        return {
+            "token_address": self.token_address,
+            "cursor": self.cursor,
+            "balances": self.balances,
+            "history": self.history,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["token_address"])
+        index.cursor = data["cursor"]
+        index.history = {address: [tuple(point) for point in points] for address, points in data["history"].items()}
+        # One sort instead of an insort per holder, which is quadratic on large tokens
+        index.balances = {address: balance for address, balance in data["balances"].items() if balance > 0}
+        index._sorted = sorted((-balance, address) for address, balance in index.balances.items())
+        index._total = sum(index.balances.values())
+        index._sum_sq = sum(balance * balance for balance in index.balances.values())
+        return index
+
+    def _adjust(self, address, delta, day):
+        old = self.balances.get(address, 0.0)
+        new = old + delta
+        if old > 0:
+            del self._sorted[bisect.bisect_left(self._sorted, (-old, address))]
+        if new > 0:
+            bisect.insort(self._sorted, (-new, address))
+            self.balances[address] = new
+        else:
+            self.balances.pop(address, None)
+            new = 0.0
+
+        self._total += new - old
+        self._sum_sq += new * new - old * old
+        self._gini = None
+
+        if day is None:
+            return
+        points = self.history.get(address)
+        if points is None and new > 0 and self._rank_within_tracked(new):
+            points = self.history[address] = []
+        if points is not None:
+            if points and points[-1][0] == day:
+                points[-1] = (day, new)
+            else:
+                points.append((day, new))
+
+    def _rank_within_tracked(self, balance):
+        if len(self._sorted) <= self.tracked:
+            return True
+        return balance >= -self._sorted[self.tracked - 1][0]
+
+
+class HolderIndexRegistry:
+    """Holder indexes by token, synced from transfer deltas and persisted to disk.
+
+    At most ``max_tokens`` indexes stay in memory; the least recently read
+    is dropped first and reloaded from its file when next needed.
+    """
+
+    def __init__(self, fetch_transfers, root=None, max_tokens=None):
+        self._fetch_transfers = fetch_transfers
+        self.root = root if root is not None else Config.HOLDER_INDEX_PATH
+        self.max_tokens = max_tokens or Config.HOLDER_INDEX_MAX_TOKENS
+        self._indexes = OrderedDict()
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._lock = threading.Lock()
+
+    def read(self, token_address, fn):
+        """
+        Sync a token's index with transfers since its cursor, then call ``fn``
+
+        Syncs happen at most every ``HOLDER_INDEX_SYNC_INTERVAL`` seconds, and
+        ``fn`` runs under the token's lock so it never sees a half-applied batch.
+
+        Returns:
+            The result of ``fn(index)``, or the fetch error if the index is
+            still empty
+        """
+        with self._locks[hash(token_address) % LOCK_STRIPES]:
+            index = self._get(token_address)
+            if time.time() - index.synced_at >= Config.HOLDER_INDEX_SYNC_INTERVAL:
+                transfers = self._fetch_transfers(token_address, index.cursor)
+                if isinstance(transfers, dict) and "error" in transfers:
+                    if not index.balances:
+                        return transfers
+                else:
+                    if transfers:
+                        index.apply_transfers(transfers)
+                        self._save(index)
+                    index.synced_at = time.time()
+            return fn(index)
+
+    def _get(self, token_address):
+        """Return the in-memory index for a token, loading it and evicting the least recently read"""
+        with self._lock:
+            index = self._indexes.get(token_address)
+            if index is not None:
+                self._indexes.move_to_end(token_address)
+                return index
+        # Only this token's lock is held, so loading never blocks other tokens
+        index = self._load(token_address) or HolderIndex(token_address)
+        with self._lock:
+            self._indexes[token_address] = index
+            while len(self._indexes) > self.max_tokens:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _path(self, token_address):
+        digest = hashlib.sha1(str(token_address).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.json")
+
+    def _load(self, token_address):
+        if not self.root:
+            return None
+        try:
+            with open(self._path(token_address)) as f:
+                return HolderIndex.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, index):
+        if not self.root:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(index.token_address)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED_STATES = (DONE, FAILED)
+
+
+class JobStore:
+    """SQLite-backed job records shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, section TEXT NOT NULL, params TEXT NOT NULL, state TEXT NOT NULL, "
+            "result TEXT, error TEXT, owner TEXT, heartbeat REAL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, section, params, max_queued):
+        """
+        Atomically return the queued or running job for the same section and
+        params, or queue a new one if fewer than ``max_queued`` are waiting
+
+        Returns:
+            str: The job ID, or None if the queue is full
+        """
+        conn = self._connect()
+        encoded = _encode_params(params)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE section = ? AND params = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+                (section, encoded, QUEUED, RUNNING),
+            ).fetchone()
+            if row is not None:
+                job_id = row[0]
+            elif conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0] >= max_queued:
+                job_id = None
+            else:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, section, params, state, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, section, encoded, QUEUED, time.time()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, section, params, state, result, error, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "section": row[1],
+            "params": json.loads(row[2]),
+            "state": row[3],
+            "result": None if row[4] is None else json.loads(row[4]),
+            "error": row[5],
+            "created_at": row[6],
+            "started_at": row[7],
+            "finished_at": row[8],
+        }
+
+    def claim(self, owner, limit):
+        """
+        Atomically move up to ``limit`` of the oldest queued jobs to running
+
+        Returns:
+            list: ``(job_id, section, params)`` of the claimed jobs
+        """
+        if limit <= 0:
+            return []
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, section, params FROM jobs WHERE state = ? ORDER BY created_at LIMIT ?",
+                (QUEUED, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = ?, owner = ?, heartbeat = ?, started_at = ? WHERE id = ?",
+                [(RUNNING, owner, now, now, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(job_id, section, json.loads(params)) for job_id, section, params in rows]
+
+    def finish(self, job_id, owner, result=None, error=None):
+        self._connect().execute(
+            "UPDATE jobs SET state = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+            (FAILED if error else DONE, None if error else json.dumps(result, default=str), error,
+             time.time(), job_id, owner),
+        )
+
+    def heartbeat(self, owner, job_ids):
+        """Mark the given jobs this owner is running as still alive"""
+        now = time.time()
+        self._connect().executemany(
+            "UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND state = ?",
+            [(now, job_id, owner, RUNNING) for job_id in job_ids],
+        )
+
+    def requeue_stale(self, older_than):
+        """Put running jobs whose owner stopped sending heartbeats back on the queue"""
+        self._connect().execute(
+            "UPDATE jobs SET state = ?, owner = NULL WHERE state = ? AND heartbeat < ?",
+            (QUEUED, RUNNING, older_than),
+        )
+
+    def purge(self, older_than):
+        self._connect().execute(
+            "DELETE FROM jobs WHERE state IN (?, ?) AND finished_at < ?", (DONE, FAILED, older_than)
+        )
+
+
+class JobService:
+    """Section queries run as background jobs on a bounded worker pool.
+
+    Jobs live in a SQLite file, so they survive worker restarts and any
+    worker can report on a job another one runs. Each process claims queued
+    jobs while it has free pool slots and sends heartbeats for the jobs it
+    is running; jobs whose heartbeats stop are put back on the queue.
+    Results flow through DataService as usual, so they also land in the
+    result cache and later plain GETs for the same section are served from it.
+    """
+
+    def __init__(self, run_fn, store=None, workers=None):
+        self._run = run_fn
+        self._store = store
+        self.workers = workers or Config.JOB_WORKERS
+        self.interval = Config.JOB_HEARTBEAT_INTERVAL
+        self.owner = None
+
+        self._executor = None
+        self._running = set()
+        self._lock = threading.Lock()
+        self._finished = threading.Condition()
+        self._stop = threading.Event()
+        self._dispatcher = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = JobStore(Config.JOB_STORE_PATH)
+        return self._store
+
+    def start(self):
+        """Start the dispatcher that claims queued jobs and keeps heartbeats. Safe to call twice."""
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            self._ensure_executor()
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, section, params):
+        """
+        Queue a job, or return the matching job that is already queued or running
+
+        Returns:
+            dict: The job, or None if the queue is full
+        """
+        job_id = self.store.submit(section, params, Config.JOB_MAX_QUEUED)
+        if job_id is None:
+            return None
+        self._claim_jobs()
+        return self.store.get(job_id)
+
+    def get(self, job_id, wait=0):
+        """
+        Return a job, waiting up to ``wait`` seconds for it to finish
+
+        Returns:
+            dict: The job, or None if there is no such job
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            job = self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["state"] in FINISHED_STATES or remaining <= 0:
+                return job
+            # Jobs finished here wake the waiter at once; others are seen on the next poll
+            with self._finished:
+                self._finished.wait(min(remaining, 0.5))
+
+    def stats(self):
+        with self._lock:
+            return {"running": len(self._running), "workers": self.workers}
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+    def _claim_jobs(self):
+        with self._lock:
+            self._ensure_executor()
+            claimed = self.store.claim(self.owner, self.workers - len(self._running))
+            self._running.update(job_id for job_id, _, _ in claimed)
+        for job_id, section, params in claimed:
+            self._executor.submit(self._execute, job_id, section, params)
+
+    def _execute(self, job_id, section, params):
+        try:
+            try:
+                result = self._run(section, params)
+                error = result["error"] if isinstance(result, dict) and "error" in result else None
+            except Exception as e:
+                logger.exception("Job failed", extra={"fields": {"job_id": job_id, "section": section}})
+                result, error = None, str(e) or type(e).__name__
+            self.store.finish(job_id, self.owner, result, error)
+        except Exception:
+            # Once out of _running the job gets no more heartbeats, so a dispatcher requeues it
+            logger.exception("Could not record job result", extra={"fields": {"job_id": job_id, "section": section}})
+        finally:
+            # Always give the slot back, or this process would claim fewer jobs from now on
+            with self._lock:
+                self._running.discard(job_id)
+            with self._finished:
+                self._finished.notify_all()
+        self._claim_jobs()
+
+    def _dispatch_loop(self):
+        # The first pass runs at once, picking up jobs left behind by a restarted worker
+        while True:
+            try:
+                now = time.time()
+                with self._lock:
+                    running = list(self._running)
+                self.store.heartbeat(self.owner, running)
+                self.store.requeue_stale(now - 3 * self.interval)
+                self.store.purge(now - Config.JOB_RETENTION)
+                self._claim_jobs()
+            except sqlite3.Error:
+                logger.exception("Job dispatcher pass failed")
+            if self._stop.wait(self.interval):
+                return
+
+
+def to_payload(job):
+    """Render a job record for the API"""
+    payload = {
+        "id": job["id"],
+        "section": job["section"],
+        "params": job["params"],
+        "state": job["state"],
+        "createdAt": _isoformat(job["created_at"]),
+        "startedAt": _isoformat(job["started_at"]),
+        "finishedAt": _isoformat(job["finished_at"]),
+    }
+    if job["state"] == DONE:
+        payload["result"] = job["result"]
+    elif job["state"] == FAILED:
+        payload["error"] = job["error"]
+    return payload
+
+
+def _encode_params(params):
+    return json.dumps(params or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
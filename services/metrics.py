@@ -0,0 +1,213 @@
+import functools
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+# Server-Timing entries for the current request, or None when not collecting
+_request_timings = ContextVar("request_timings", default=None)
+
+# WSGI environ key set by servers that time whole requests themselves, as asgi.py does
+# across the passes of a request and its Dune wait
+TIMED_BY_SERVER = "verdexa.timed_by_server"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with labels"""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): [list(s[0]), s[1], s[2]] for key, s in self._series.items()}
+
+    def render(self, snapshots):
+        """Render merged per-process snapshots in the Prometheus text format"""
+        merged = {}
+        for snapshot in snapshots:
+            for key, (counts, total, count) in snapshot.items():
+                series = merged.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key in sorted(merged):
+            counts, total, count = merged[key]
+            labels = dict(zip(self.labelnames, json.loads(key)))
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of histograms plus gauge callbacks, exported on /metrics.
+
+    Each gunicorn worker keeps its own histograms. With an export directory
+    set, every worker periodically writes a snapshot there and /metrics
+    merges all of them, so any worker can answer a scrape for the host.
+    """
+
+    def __init__(self):
+        self.histograms = []
+        self._gauges = []
+        self._export_dir = None
+        self._exporter = None
+
+    def histogram(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def gauge_callback(self, name, documentation, fn):
+        """Register a gauge whose ``fn`` yields ``(labels, value)`` pairs at scrape time"""
+        self._gauges = [gauge for gauge in self._gauges if gauge[0] != name]
+        self._gauges.append((name, documentation, fn))
+
+    def start_export(self, directory, interval=5):
+        if self._exporter is not None or not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._export_dir = directory
+
+        def export_loop():
+            while True:
+                self._export()
+                time.sleep(interval)
+
+        self._exporter = threading.Thread(target=export_loop, name="metrics-export", daemon=True)
+        self._exporter.start()
+
+    def render(self):
+        local = [h.snapshot() for h in self.histograms]
+        if self._export_dir:
+            self._export(local)
+            per_process = []
+            for path in glob.glob(os.path.join(self._export_dir, "*.json")):
+                try:
+                    with open(path) as f:
+                        per_process.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+            snapshots = [[p.get(h.name, {}) for p in per_process] for h in self.histograms]
+        else:
+            snapshots = [[snapshot] for snapshot in local]
+
+        lines = []
+        for histogram, histogram_snapshots in zip(self.histograms, snapshots):
+            lines.extend(histogram.render(histogram_snapshots))
+        for name, documentation, fn in self._gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in fn():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _export(self, local=None):
+        local = local or [h.snapshot() for h in self.histograms]
+        path = os.path.join(self._export_dir, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({h.name: snapshot for h, snapshot in zip(self.histograms, local)}, f)
+        os.replace(path + ".tmp", path)
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "verdexa_http_request_seconds", "Time spent handling API requests", ["route", "method", "status"])
+HTTP_QUEUE_SECONDS = REGISTRY.histogram(
+    "verdexa_http_queue_seconds", "Time between the proxy accepting a request and a worker starting it", ["route"])
+HTTP_SERIALIZE_SECONDS = REGISTRY.histogram(
+    "verdexa_http_serialize_seconds", "Time spent encoding JSON responses", ["route"])
+DATA_SERVICE_SECONDS = REGISTRY.histogram(
+    "verdexa_data_service_seconds", "Time spent in DataService methods", ["method"])
+DUNE_QUERY_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_query_seconds", "Time for DuneService.execute_query by cache outcome", ["query_id", "cache"])
+DUNE_UPSTREAM_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_upstream_seconds", "Time for a full upstream execution, including polling", ["query_id"])
+DUNE_EXECUTE_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_execute_seconds", "Time for the Dune execute request", ["query_id"])
+DUNE_POLL_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_poll_seconds", "Time for each Dune execution status request", ["query_id"])
+DUNE_WAIT_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_wait_seconds", "Time from execution start until Dune reports completion", ["query_id"])
+DUNE_RESULTS_SECONDS = REGISTRY.histogram(
+    "verdexa_dune_results_seconds", "Time to download Dune execution results", ["query_id"])
+
+
+def start_request_timings():
+    """Begin collecting Server-Timing entries for the current request"""
+    return _request_timings.set([])
+
+
+def record_timing(name, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def server_timing_header():
+    """Return the Server-Timing header value for the current request, or None"""
+    timings = _request_timings.get()
+    if not timings:
+        return None
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
+
+
+@contextmanager
+def timed(histogram, timing_name=None, **labels):
+    """Observe the duration of a block, optionally adding it to Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        if timing_name:
+            record_timing(timing_name, elapsed)
+
+
+def instrumented(fn):
+    """Time a DataService method under its own name"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(DATA_SERVICE_SECONDS, timing_name=fn.__name__, method=fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
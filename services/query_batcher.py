@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future
+from config import Config
+
+
+class QueryBatcher:
+    """Collect per-token executions of the same query into batched executions.
+
+    The first miss for a query opens a batch; misses for other tokens that
+    arrive within ``window`` seconds join it, up to ``max_size`` tokens. The
+    batch then runs once through ``run_fn(query_id, tokens, priority)``,
+    which returns a result per token, and every caller gets its token's
+    result. Execution count scales with batches rather than tokens.
+    """
+
+    def __init__(self, run_fn, window=None, max_size=None):
+        self._run = run_fn
+        self.window = Config.QUERY_BATCH_WINDOW if window is None else window
+        self.max_size = max_size or Config.QUERY_BATCH_MAX_SIZE
+
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "tokens": 0, "largest": 0}
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def submit(self, query_id, token, priority=0):
+        """
+        Add a token to the open batch for a query, opening one if needed
+
+        Returns:
+            Future: Resolves to the token's result once the batch has run
+        """
+        key = (query_id, priority)
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = {}
+                timer = threading.Timer(self.window, self._flush, (key, batch))
+                timer.daemon = True
+                timer.start()
+            future = batch.get(token)
+            if future is None:
+                future = batch[token] = Future()
+                if len(batch) >= self.max_size:
+                    # Close the full batch now; its timer will find it gone
+                    del self._batches[key]
+                    threading.Thread(target=self._execute, args=(key, batch), name="query-batch", daemon=True).start()
+            return future
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = len(self._batches)
+        return stats
+
+    def _flush(self, key, batch):
+        with self._lock:
+            if self._batches.get(key) is not batch:
+                return
+            del self._batches[key]
+        self._execute(key, batch)
+
+    def _execute(self, key, batch):
+        query_id, priority = key
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["tokens"] += len(batch)
+            self._stats["largest"] = max(self._stats["largest"], len(batch))
+        try:
+            results = self._run(query_id, list(batch), priority)
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for token, future in batch.items():
+            future.set_result(results.get(token))
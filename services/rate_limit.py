@@ -0,0 +1,119 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    """In-process token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if available. Returns True on success."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a SQLite file, so every worker on
+    the host draws from the same budget"""
+
+    def __init__(self, path, name, rate, capacity=None):
+        self.path = path
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self, tokens=1):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            available = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            acquired = available >= tokens
+            if acquired:
+                available -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, available, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class PriorityRateLimiter:
+    """Async gate in front of a token bucket where interactive callers go first.
+
+    Callers that find the bucket empty try again shortly, and background
+    callers also hold back while any interactive caller is waiting. ``pause``
+    stops every caller for a while, e.g. after the upstream answers 429.
+    Meant for a single event loop, so it needs no locking.
+    """
+
+    def __init__(self, bucket=None, rate=None):
+        self.bucket = bucket
+        # Retry about as often as the bucket refills
+        self.retry_interval = min(max(1 / rate, 0.05), 1.0) if rate else 0.05
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._resume_at = 0.0
+
+    async def acquire(self, priority=INTERACTIVE):
+        self._waiting[priority] += 1
+        try:
+            while True:
+                paused_for = self._resume_at - time.monotonic()
+                yielding = priority == BACKGROUND and self._waiting[INTERACTIVE] > 0
+                if paused_for <= 0 and not yielding and await self._try_acquire():
+                    return
+                await asyncio.sleep(max(paused_for, self.retry_interval) * random.uniform(1, 1.5))
+        finally:
+            self._waiting[priority] -= 1
+
+    def pause(self, seconds):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def _try_acquire(self):
+        if self.bucket is None:
+            return True
+        if isinstance(self.bucket, SharedTokenBucket):
+            # The shared bucket takes a SQLite write lock, so keep it off the event loop
+            return await asyncio.get_running_loop().run_in_executor(None, self.bucket.try_acquire)
+        return self.bucket.try_acquire()
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from config import Config
+from services.cache_service import make_cache_key
+from services.rate_limit import SharedTokenBucket, TokenBucket
+
+
+class RefreshScheduler:
+    """Background re-execution of cached queries.
+
+    Two kinds of work end up on the refresh queue: stale entries that were
+    just served to a caller (stale-while-revalidate), and hot keys whose
+    entry is about to expire, found by a periodic scan. Hotness is an
+    exponentially decayed request count per key. Every refresh must take a
+    token from the rate budget first, so background work can never use more
+    than ``REFRESH_BUDGET_PER_MINUTE`` executions.
+
+    With ``REFRESH_SCHEDULER_ENABLED=0`` no thread is ever started and
+    nothing is queued, so callers must not serve stale entries.
+    """
+
+    def __init__(self, refresh_fn, expires_at_fn, budget=None, enabled=None):
+        self._refresh_fn = refresh_fn
+        self._expires_at = expires_at_fn
+        self.budget = budget or self._default_budget()
+        self.enabled = Config.REFRESH_SCHEDULER_ENABLED if enabled is None else enabled
+
+        self.interval = Config.REFRESH_INTERVAL
+        self.lead_time = Config.REFRESH_LEAD_TIME
+        self.min_hits = Config.REFRESH_MIN_HITS
+        self.half_life = Config.REFRESH_HOT_HALF_LIFE
+
+        self._keys = {}
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scanner = None
+        self._workers = []
+        self._stats = {"scheduled": 0, "refreshed": 0, "throttled": 0, "failed": 0}
+
+    @staticmethod
+    def _default_budget():
+        rate = Config.REFRESH_BUDGET_PER_MINUTE / 60
+        capacity = max(1, Config.REFRESH_BUDGET_PER_MINUTE // 6)
+        if Config.REFRESH_BUDGET_PATH:
+            return SharedTokenBucket(Config.REFRESH_BUDGET_PATH, "refresh", rate, capacity)
+        return TokenBucket(rate, capacity)
+
+    def start(self):
+        """Start the hot-key scanner and the refresh workers. Safe to call twice."""
+        if not self.enabled:
+            return
+        self._ensure_workers()
+        with self._lock:
+            if self._scanner is None:
+                self._scanner = threading.Thread(target=self._scan_loop, name="refresh-scanner", daemon=True)
+                self._scanner.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def record(self, query_id, params=None):
+        """Count a request for a key towards its hotness score"""
+        if not self.enabled:
+            # Only the scanner prunes cold keys, so don't track any without it
+            return
+        key = make_cache_key(query_id, params)
+        now = time.monotonic()
+        with self._lock:
+            tracked = self._keys.get(key)
+            if tracked is None:
+                self._keys[key] = [query_id, params, 1.0, now]
+            else:
+                tracked[2] = self._decayed(tracked[2], now - tracked[3]) + 1
+                tracked[3] = now
+
+    def request_refresh(self, query_id, params=None):
+        """Queue a background refresh unless one is already pending or the scheduler is disabled"""
+        if not self.enabled:
+            return
+        key = make_cache_key(query_id, params)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            self._stats["scheduled"] += 1
+        self._ensure_workers()
+        self._queue.put((key, query_id, params))
+
+    def hot_keys(self):
+        """Return ``(query_id, params, score)`` for keys at or above the hotness threshold"""
+        now = time.monotonic()
+        with self._lock:
+            scored = [
+                (query_id, params, self._decayed(score, now - last_seen))
+                for query_id, params, score, last_seen in self._keys.values()
+            ]
+        return [entry for entry in scored if entry[2] >= self.min_hits]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked_keys"] = len(self._keys)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _decayed(self, score, elapsed):
+        return score * 0.5 ** (elapsed / self.half_life)
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(Config.REFRESH_WORKERS):
+                worker = threading.Thread(target=self._work_loop, name=f"refresh-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _scan_loop(self):
+        while not self._stop.wait(self.interval):
+            self._scan()
+
+    def _scan(self):
+        now = time.time()
+        for query_id, params, _ in self.hot_keys():
+            expires_at = self._expires_at(query_id, params)
+            if expires_at is not None and expires_at - now < self.lead_time:
+                self.request_refresh(query_id, params)
+        self._prune()
+
+    def _prune(self):
+        # Forget keys whose score has decayed to almost nothing
+        now = time.monotonic()
+        with self._lock:
+            cold = [
+                key for key, (_, _, score, last_seen) in self._keys.items()
+                if self._decayed(score, now - last_seen) < 0.1
+            ]
+            for key in cold:
+                del self._keys[key]
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            key, query_id, params = self._queue.get()
+            try:
+                if not self.budget.try_acquire():
+                    with self._lock:
+                        self._stats["throttled"] += 1
+                    continue
+                self._refresh_fn(query_id, params)
+                with self._lock:
+                    self._stats["refreshed"] += 1
+            except Exception:
+                with self._lock:
+                    self._stats["failed"] += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import date
+import numpy as np
+from config import Config
+from utils.helpers import generate_date_range
+
+
+class SeriesStore:
+    """On-disk store of per-token daily series.
+
+    Each (series name, token) pair is one ``values.npy`` matrix with a row
+    per calendar day from the first stored day to the last, plus a
+    ``columns.json`` sidecar with column names and non-series metadata.
+    The first column is the day as a proleptic ordinal once it has been
+    fetched and NaN until then; the other columns hold the series values.
+    Matrices are opened with ``mmap_mode='r'`` so a window is a view into
+    the page cache rather than a copy.
+
+    Past days never change, so a request only fetches the days of its window
+    that were never fetched, plus the last fetched day, which may still have
+    been accumulating. Refetched days inside the stored range are written in
+    place; the matrix is only rewritten when it grows or gains a column.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or Config.SERIES_STORE_PATH
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def get_series(self, name, token_address, days, fetch):
+        """
+        Return a window of a daily series, fetching only what is missing
+
+        Args:
+            name (str): Series name, e.g. the query ID
+            token_address (str): Token the series belongs to
+            days (int): Window length, as for ``generate_date_range``
+            fetch (callable): ``fetch(start_date, end_date)`` returning a frame
+                for the inclusive ISO date range, or None if it failed
+
+        Returns:
+            dict: Frame with ``dates``, ``columns`` and ``meta`` keys
+        """
+        window = generate_date_range(days)
+        if not window:
+            return {"dates": [], "columns": {}, "meta": {}}
+        first, last = _to_ordinal(window[0]), _to_ordinal(window[-1])
+
+        with self._lock_for(name, token_address):
+            stored = self.read(name, token_address)
+            ranges = self._missing_ranges(stored, first, last)
+            fetched = [(start, end, fetch(_from_ordinal(start), _from_ordinal(end))) for start, end in ranges]
+            fetched = [(start, end, frame) for start, end, frame in fetched if frame is not None]
+            if fetched:
+                stored = self._merge(name, token_address, stored, fetched)
+
+        if stored is None:
+            return {"dates": [], "columns": {}, "meta": {}}
+        return self._window(stored, first, last)
+
+    def read(self, name, token_address):
+        """Return ``(matrix, columns, meta)`` memory-mapped from disk, or None"""
+        directory = self._directory(name, token_address)
+        try:
+            with open(os.path.join(directory, "columns.json")) as f:
+                header = json.load(f)
+            matrix = np.load(os.path.join(directory, "values.npy"), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        # A concurrent writer may have replaced one file but not yet the other
+        if matrix.ndim != 2 or matrix.shape[1] != len(header["columns"]) + 1:
+            return None
+        return matrix, header["columns"], header.get("meta", {})
+
+    def write(self, name, token_address, matrix, columns, meta):
+        directory = self._directory(name, token_address)
+        os.makedirs(directory, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        values_path = os.path.join(directory, "values.npy")
+        with open(values_path + suffix, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float64))
+        os.replace(values_path + suffix, values_path)
+        self._write_header(name, token_address, columns, meta)
+
+    def _missing_ranges(self, stored, first, last):
+        """Return the inclusive ordinal ranges of the window to fetch, in order"""
+        needed = np.ones(last - first + 1, dtype=bool)
+        if stored is not None:
+            dates = stored[0][:, 0]
+            dates = dates[~np.isnan(dates)].astype(np.int64)
+            if len(dates):
+                inside = dates[(dates >= first) & (dates <= last)]
+                needed[inside - first] = False
+                # The last fetched day may have been partial at the time, so refetch it
+                stored_last = int(dates.max())
+                if first <= stored_last <= last:
+                    needed[stored_last - first] = True
+
+        ranges = []
+        for offset in np.flatnonzero(needed).tolist():
+            day = first + offset
+            if ranges and ranges[-1][1] == day - 1:
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+        return [tuple(r) for r in ranges]
+
+    def _merge(self, name, token_address, stored, fetched):
+        """
+        Store fetched frames and return the updated ``(matrix, columns, meta)``
+
+        Every day of a fetched range is marked as fetched, including days the
+        frame has no values for. Later frames win, so refetched days replace
+        what was stored. Metadata is merged key by key, so a short range that
+        lacks a field never erases what an earlier fetch found.
+        """
+        columns = list(stored[1]) if stored is not None else []
+        meta = dict(stored[2]) if stored is not None else {}
+        for _, _, frame in fetched:
+            for column in frame["columns"]:
+                if column not in columns:
+                    columns.append(column)
+            _merge_meta(meta, frame.get("meta", {}))
+
+        lo = min(start for start, _, _ in fetched)
+        hi = max(end for _, end, _ in fetched)
+        rows = np.full((hi - lo + 1, len(columns) + 1), np.nan)
+        rows[:, 0] = np.arange(lo, hi + 1)
+        filled = np.zeros(hi - lo + 1, dtype=bool)
+        for start, end, frame in fetched:
+            filled[start - lo:end - lo + 1] = True
+            offsets = np.array([_to_ordinal(day) - lo for day in frame["dates"]], dtype=np.int64)
+            keep = (offsets >= start - lo) & (offsets <= end - lo)
+            for column, series in frame["columns"].items():
+                values = np.array([np.nan if v is None else v for v in series], dtype=np.float64)
+                rows[offsets[keep], columns.index(column) + 1] = values[keep]
+        # Rows between two fetched ranges that neither covered stay as stored
+        offsets = np.flatnonzero(filled)
+        rows = rows[offsets]
+        days = offsets + lo
+
+        if stored is not None and columns == list(stored[1]) and _covers(stored[0], days):
+            matrix = stored[0]
+            index = days - int(matrix[0, 0])
+            # Refetching the last day usually changes nothing, so skip the write then
+            if not np.array_equal(matrix[index], rows, equal_nan=True):
+                self._write_rows(name, token_address, index, rows)
+            if meta != stored[2]:
+                self._write_header(name, token_address, columns, meta)
+            return matrix, columns, meta
+
+        matrix, lo = _dense(stored, columns, days)
+        matrix[days - lo] = rows
+        self.write(name, token_address, matrix, columns, meta)
+        return matrix, columns, meta
+
+    def _window(self, stored, first, last):
+        matrix, columns, meta = stored
+        dates = matrix[:, 0]
+        # Fetched days with no values at all had no data upstream
+        keep = (dates >= first) & (dates <= last) & ~np.all(np.isnan(matrix[:, 1:]), axis=1)
+        view = matrix[keep]
+        return {
+            "dates": [_from_ordinal(int(day)) for day in view[:, 0]],
+            "columns": {
+                column: [None if v != v else v for v in view[:, j].tolist()]
+                for j, column in enumerate(columns, start=1)
+            },
+            "meta": meta,
+        }
+
+    def _write_rows(self, name, token_address, index, rows):
+        """Overwrite rows of the stored matrix in place"""
+        path = os.path.join(self._directory(name, token_address), "values.npy")
+        matrix = np.load(path, mmap_mode="r+")
+        matrix[index] = rows
+        matrix.flush()
+
+    def _write_header(self, name, token_address, columns, meta):
+        path = os.path.join(self._directory(name, token_address), "columns.json")
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(path + suffix, "w") as f:
+            json.dump({"columns": list(columns), "meta": meta}, f)
+        os.replace(path + suffix, path)
+
+    def _directory(self, name, token_address):
+        digest = hashlib.sha1(str(token_address).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, name, digest)
+
+    def _lock_for(self, name, token_address):
+        with self._locks_lock:
+            return self._locks.setdefault((name, token_address), threading.Lock())
+
+
+def _to_ordinal(day):
+    return date.fromisoformat(day).toordinal()
+
+
+def _from_ordinal(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+def _merge_meta(meta, update):
+    """Merge ``update`` into ``meta`` in place, recursing into dicts and skipping None"""
+    for key, value in update.items():
+        if value is None:
+            continue
+        if isinstance(value, dict) and isinstance(meta.get(key), dict):
+            meta[key] = dict(meta[key])
+            _merge_meta(meta[key], value)
+        else:
+            meta[key] = value
+
+
+def _covers(matrix, days):
+    """Whether a matrix has a row per day from its first to its last, spanning ``days``"""
+    if len(matrix) == 0:
+        return False
+    lo, hi = int(matrix[0, 0]), int(matrix[-1, 0])
+    return hi - lo + 1 == len(matrix) and lo <= days[0] and days[-1] <= hi
+
+
+def _dense(stored, columns, days):
+    """
+    Return a matrix with a row per day spanning the stored and new days, filled
+    with the stored rows, and the ordinal of its first day. Days never fetched
+    have NaN for their date.
+    """
+    lo, hi = int(days[0]), int(days[-1])
+    old = None
+    if stored is not None and len(stored[0]):
+        old = np.asarray(stored[0])
+        old = old[~np.isnan(old[:, 0])]
+        if len(old):
+            lo, hi = min(lo, int(old[0, 0])), max(hi, int(old[-1, 0]))
+
+    matrix = np.full((hi - lo + 1, len(columns) + 1), np.nan)
+    if old is not None and len(old):
+        # New columns are only ever appended, so stored columns keep their positions
+        matrix[old[:, 0].astype(np.int64) - lo, :old.shape[1]] = old
+    return matrix, lo
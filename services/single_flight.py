@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse identical concurrent calls into a single execution.
+
+    Within a process, the first caller for a key becomes the leader and runs
+    the function; every other caller waits for the leader and receives the
+    same result. When ``lock_dir`` is set, leaders in different worker
+    processes also serialize on a per-key lock file, so only one worker on
+    the host executes while the rest pick the result up from the shared
+    cache via ``recheck``.
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0, "cross_process_coalesced": 0}
+
+    def do(self, key, fn, recheck=None):
+        """
+        Run ``fn`` once for all concurrent callers sharing ``key``
+
+        Args:
+            key (str): Identity of the call, e.g. a cache key
+            fn (callable): Function producing the result
+            recheck (callable): Optional function returning ``(hit, value)``,
+                consulted by the leader before executing in case another
+                caller has already produced the result
+
+        Returns:
+            The result of ``fn`` (or of ``recheck`` on a hit)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, fn, recheck)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+    def _lead(self, key, fn, recheck):
+        if recheck is not None:
+            hit, value = recheck()
+            if hit:
+                return value
+
+        if not self.lock_dir:
+            return self._execute(fn)
+
+        with self._file_lock(key) as waited:
+            if waited and recheck is not None:
+                hit, value = recheck()
+                if hit:
+                    with self._lock:
+                        self._stats["cross_process_coalesced"] += 1
+                    return value
+            return self._execute(fn)
+
+    def _execute(self, fn):
+        with self._lock:
+            self._stats["executions"] += 1
+        return fn()
+
+    @contextmanager
+    def _file_lock(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        path = os.path.join(self.lock_dir, f"{digest}.lock")
+        with open(path, "a") as handle:
+            waited = False
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                waited = True
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield waited
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
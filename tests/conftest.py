@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from benchmarks import fake_dune
+from services.async_dune_client import AsyncDuneClient
+from services.rate_limit import PriorityRateLimiter
+
+
+@pytest.fixture
+def dune():
+    """A fake Dune API whose executions finish at once; faults are off until a test sets them"""
+    stub = fake_dune.FakeDune(latency=0.0, rows=25, retry_after=None)
+    server, stub.base_url = fake_dune.start_server(stub)
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(dune):
+    """Build AsyncDuneClients for the fake Dune API with no rate limit and near-instant backoff"""
+    def make(**kwargs):
+        kwargs.setdefault("base_url", dune.base_url)
+        kwargs.setdefault("limiter", PriorityRateLimiter())
+        kwargs.setdefault("poll_interval", 0.01)
+        client = AsyncDuneClient(**kwargs)
+        client.retry_base_delay = 0.001
+        return client
+    return make
+
+
+@pytest.fixture
+def run():
+    """Run ``coro_fn(client)`` on a fresh event loop and close the client's session there"""
+    def run(client, coro_fn):
+        async def main():
+            try:
+                return await coro_fn(client)
+            finally:
+                await client.close()
+        return asyncio.run(main())
+    return run
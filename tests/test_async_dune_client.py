@@ -0,0 +1,29 @@
+def test_execute_query_returns_rows(dune, make_client, run):
+    result = run(make_client(), lambda client: client.execute_query("bot_volume", {"token_address": "a"}))
+
+    assert len(result["result"]["rows"]) == 25
+    assert dune.counts["execute"] == 1
+
+
+def test_stream_query_pages_through_every_row(dune, make_client, run):
+    async def collect(client):
+        return [rows async for rows in client.stream_query("token_transfers", page_size=10)]
+
+    pages = run(make_client(), collect)
+
+    assert [len(rows) for rows in pages] == [10, 10, 5]
+    assert [row["seq"] for rows in pages for row in rows] == list(range(25))
+    assert dune.counts["execute"] == 1
+    assert dune.counts["results"] == 3
+
+
+def test_stream_query_yields_error_row_for_failed_execution(dune, make_client, run):
+    dune.fail_rate = 1.0
+
+    async def collect(client):
+        return [rows async for rows in client.stream_query("token_transfers", page_size=10)]
+
+    pages = run(make_client(), collect)
+
+    assert len(pages) == 1 and "error" in pages[0][0]
+    assert dune.counts["results"] == 0
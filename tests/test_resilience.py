@@ -0,0 +1,77 @@
+import socket
+import time
+
+from config import Config
+from services.async_dune_client import UNAVAILABLE
+from services.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_execute_post_is_retried_after_429(dune, make_client, run):
+    dune.throttle_rate = 1.0
+
+    execution_id, error = run(make_client(retry_attempts=2), lambda client: client.execute("q"))
+
+    assert execution_id is None and error
+    assert dune.counts["throttled"] == 3
+
+
+def test_execute_post_is_retried_after_failed_connect(make_client, run):
+    client = make_client(base_url=f"http://127.0.0.1:{unused_port()}/api/v1", retry_attempts=2)
+
+    execution_id, error = run(client, lambda client: client.execute("q"))
+
+    assert execution_id is None and error
+    assert client.stats()["connection_errors"] == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_execute_post_is_not_retried_after_5xx(dune, make_client, run):
+    dune.error_rate = 1.0
+
+    execution_id, error = run(make_client(retry_attempts=2), lambda client: client.execute("q"))
+
+    assert execution_id is None and error
+    assert dune.counts["errors"] == 1
+
+
+def test_status_get_is_retried_after_5xx(dune, make_client, run):
+    dune.error_rate = 1.0
+
+    state, error = run(make_client(retry_attempts=2), lambda client: client.get_status("01FAKE00000001"))
+
+    assert state is None and error
+    assert dune.counts["errors"] == 3
+
+
+def test_breaker_opens_after_failures_and_half_opens_after_reset_timeout(dune, make_client, run):
+    breaker = CircuitBreaker(Config.DUNE_BREAKER_FAILURES, reset_timeout=0.2)
+    client = make_client(breaker=breaker, retry_attempts=0)
+    dune.error_rate = 1.0
+
+    async def scenario(client):
+        for _ in range(Config.DUNE_BREAKER_FAILURES):
+            assert "error" in await client.execute_query("q")
+        assert breaker.state == OPEN
+        # While open, calls fail at once without reaching Dune
+        assert await client.execute_query("q") == {"error": UNAVAILABLE}
+        assert dune.counts["errors"] == Config.DUNE_BREAKER_FAILURES
+
+        # After the reset timeout one trial goes through; a failed trial opens the breaker again
+        time.sleep(0.25)
+        assert "error" in await client.execute_query("q")
+        assert dune.counts["errors"] == Config.DUNE_BREAKER_FAILURES + 1
+        assert await client.execute_query("q") == {"error": UNAVAILABLE}
+
+        # A successful trial closes it
+        time.sleep(0.25)
+        dune.error_rate = 0.0
+        assert len((await client.execute_query("q"))["result"]["rows"]) == 25
+        assert breaker.state == CLOSED
+
+    run(client, scenario)
@@ -1,5 +1,5 @@
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 def generate_date_range(days=30):
     """Generate a date range for the last n days"""
@@ -15,6 +15,17 @@ def generate_date_range(days=30):
     
     return date_range
 
+def format_timestamp(epoch):
+    """Format epoch seconds as a UTC timestamp the way Dune query parameters take them"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_timestamp(value):
+    """Parse epoch seconds or a UTC timestamp as Dune returns it, e.g. '2025-01-01 13:00:00.000 UTC'"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value)[:19].replace(' ', 'T'))
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
 def format_dune_response(response):
     """Format a Dune API response for easier consumption"""
     try:
@@ -26,4 +37,37 @@ def format_dune_response(response):
         
         return rows
     except Exception as e:
-        return {'error': str(e)}
\ No newline at end of file
+        return {'error': str(e)}
+
+def iter_dune_rows(response):
+    """Yield the rows of a Dune API response one at a time without copying them"""
+    if isinstance(response, list):
+        yield from response
+    elif isinstance(response, dict) and 'result' in response:
+        yield from response['result'].get('rows', [])
+    else:
+        yield response
+
+def split_rows_by_token(response, tokens, key='token_address'):
+    """Split a batched Dune response into one response per token holding only its rows"""
+    rows = {token: [] for token in tokens}
+    for row in iter_dune_rows(response):
+        token_rows = rows.get(row.get(key)) if isinstance(row, dict) else None
+        if token_rows is not None:
+            token_rows.append(row)
+    base = {k: v for k, v in response.items() if k != 'result'} if isinstance(response, dict) else {}
+    return {token: {**base, 'result': {'rows': token_rows}} for token, token_rows in rows.items()}
+
+def stream_ndjson(rows):
+    """Encode rows as newline-delimited JSON, one chunk per row"""
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
+
+def stream_json_array(rows):
+    """Encode rows as a JSON array, emitted incrementally"""
+    yield '['
+    first = True
+    for row in rows:
+        yield ('' if first else ',') + json.dumps(row, separators=(',', ':'))
+        first = False
+    yield ']'